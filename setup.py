@@ -40,4 +40,5 @@ setuptools.setup(
     package_dir = {"": "src"},
     packages = setuptools.find_packages(where="src"),
     python_requires = ">=3.10",
+    extras_require = {"zstd": ["zstandard"]},
 )
@@ -14,6 +14,8 @@ create sql script files from the Oracle schema to run repeatedly on PostgreSQL,
 from easyo2p._constants import *
 import easyo2p._main
 O2P = easyo2p._main.O2P      # pylint: disable=protected-access      # Protected to limit main usage
+import easyo2p._replay
+replay = easyo2p._replay.replay      # pylint: disable=protected-access
 
 # -----------------------------------------------
 
@@ -0,0 +1,47 @@
+"""
+
+easyo2p: __main__.py
+Command line, ``python -m easyo2p replay <target_path> <postgres_conn>``
+
+"""
+
+# -----------------------------------------------
+
+import argparse
+import sys
+
+import easyo2p
+
+# -----------------------------------------------
+
+
+def main(argv=None) -> int:
+    """ Runs the command line """
+
+    parser = argparse.ArgumentParser(prog='easyo2p', description=easyo2p.__doc__.strip())
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    replay = commands.add_parser('replay', help='Runs the ETL files on PostgreSQL, in parallel')
+    replay.add_argument('target_path', help='the target path holding the ETL files')
+    replay.add_argument('postgres_conn', help='the psycopg2 connection string')
+    replay.add_argument('--jobs', type=int, default=4, help='files run at the same time')
+    replay.add_argument('--drop-schema', action='store_true', help='drops the schema first')
+    replay.add_argument('--encoding', help='the encoding of the ETL files')
+
+    args = parser.parse_args(argv)
+    if args.command == 'replay':
+        easyo2p.replay(
+            args.target_path, args.postgres_conn, jobs=args.jobs,
+            drop_schema=args.drop_schema, encoding=args.encoding
+        )
+
+    return 0
+
+
+# -----------------------------------------------
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# -----------------------------------------------
+# End.
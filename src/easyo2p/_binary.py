@@ -0,0 +1,225 @@
+"""
+
+easyo2p: _binary.py
+Binary COPY format encoders for the PostgreSQL datatypes created by _tables
+
+"""
+
+# -----------------------------------------------
+
+from __future__ import annotations
+from typing import IO, Callable, List, Optional
+import datetime
+import decimal
+import struct
+
+# -----------------------------------------------
+
+HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+TRAILER = struct.pack('!h', -1)
+
+_NULL = struct.pack('!i', -1)
+_EPOCH = datetime.datetime(2000, 1, 1)
+
+_INT2 = struct.Struct('!ih')
+_INT4 = struct.Struct('!ii')
+_INT8 = struct.Struct('!iq')
+_FLOAT4 = struct.Struct('!if')
+_FLOAT8 = struct.Struct('!id')
+_LENGTH = struct.Struct('!i')
+_FIELDS = struct.Struct('!h')
+
+# -----------------------------------------------
+
+
+def _bytea(value) -> bytes:
+    """ Encodes a BYTEA value """
+
+    return _LENGTH.pack(len(value)) + value
+
+
+# ---
+
+
+def _float4(value) -> bytes:
+    """ Encodes a REAL value """
+
+    return _FLOAT4.pack(4, value)
+
+
+# ---
+
+
+def _float8(value) -> bytes:
+    """ Encodes a DOUBLE PRECISION value """
+
+    return _FLOAT8.pack(8, value)
+
+
+# ---
+
+
+def _int2(value) -> bytes:
+    """ Encodes a SMALLINT value """
+
+    return _INT2.pack(2, int(value))
+
+
+# ---
+
+
+def _int4(value) -> bytes:
+    """ Encodes an INTEGER value """
+
+    return _INT4.pack(4, int(value))
+
+
+# ---
+
+
+def _int8(value) -> bytes:
+    """ Encodes a BIGINT value """
+
+    return _INT8.pack(8, int(value))
+
+
+# ---
+
+
+def _numeric(value) -> bytes:
+    """ Encodes a NUMERIC value, as base 10000 digits """
+
+    if not isinstance(value, decimal.Decimal):
+        value = decimal.Decimal(str(value))
+    if not value.is_finite():
+        return _LENGTH.pack(8) + struct.pack('!hhHH', 0, 0, 0xC000, 0)
+
+    sign, digits, exponent = value.as_tuple()
+    if exponent > 0:
+        digits += (0,) * exponent
+        exponent = 0
+
+    dscale = -exponent
+    int_digits = len(digits) - dscale
+    text = ''.join(map(str, digits))
+    text = '0' * (-int_digits % 4) + text + '0' * (-dscale % 4)
+    groups = [int(text[i:i + 4]) for i in range(0, len(text), 4)]
+    weight = (int_digits + (-int_digits % 4)) // 4 - 1
+
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+
+    data = struct.pack(f'!hhHH{len(groups)}H', len(groups), weight,
+                       0x4000 if sign else 0, dscale, *groups)
+    return _LENGTH.pack(len(data)) + data
+
+
+# ---
+
+
+def _text(value) -> bytes:
+    """ Encodes a text value, NUL characters are not valid in PostgreSQL text """
+
+    data = str(value).replace('\x00', '').encode('utf-8')
+    return _LENGTH.pack(len(data)) + data
+
+
+# ---
+
+
+def _timestamp(value) -> bytes:
+    """ Encodes a TIMESTAMP value, to the second, as with the insert statements """
+
+    delta = value.replace(microsecond=0) - _EPOCH
+    return _INT8.pack(8, (delta.days * 86400 + delta.seconds) * 1_000_000)
+
+
+# -----------------------------------------------
+
+
+def get_converter(datatype: str) -> Optional[Callable]:
+    """
+    Gets the binary encoder for a PostgreSQL datatype
+
+    :param datatype: the datatype, as used in the create table statement
+    :return: the encoder function, or None if the datatype is not supported
+    """
+
+    datatype = datatype.upper().split(' CHECK ', 1)[0].strip()
+
+    if datatype in ['SMALLINT', 'INTEGER', 'BIGINT']:
+        return {'SMALLINT': _int2, 'INTEGER': _int4, 'BIGINT': _int8}[datatype]
+    if datatype.startswith('NUMERIC'):
+        return _numeric
+    if datatype.startswith('FLOAT('):
+        return _float4 if int(datatype[6:-1]) <= 24 else _float8
+    if datatype.startswith(('VARCHAR', 'TEXT')):
+        return _text
+    if datatype.startswith('TIMESTAMP') and 'ZONE' not in datatype:
+        return _timestamp
+    if datatype == 'BYTEA':
+        return _bytea
+    return None
+
+
+# -----------------------------------------------
+
+
+def encode_row(converters: List[Callable], row) -> bytes:
+    """ Encodes a row of values with the column converters """
+
+    return _FIELDS.pack(len(converters)) + b''.join([
+        _NULL if col is None else converter(col) for converter, col in zip(converters, row)
+    ])
+
+
+# ---
+
+
+def write_lob(data: IO, lob, read_size: int):
+    """
+    Writes a LOB value, read from its locator in pieces of read_size.
+    The length is written once all the pieces are, so the value is not held in memory.
+    """
+
+    start = data.tell()
+    data.write(_LENGTH.pack(0))
+
+    length = 0
+    offset = 1
+    while piece := lob.read(offset, read_size):
+        offset += len(piece)
+        if isinstance(piece, str):
+            piece = piece.replace('\x00', '').encode('utf-8')
+        data.write(piece)
+        length += len(piece)
+
+    end = data.tell()
+    data.seek(start)
+    data.write(_LENGTH.pack(length))
+    data.seek(end)
+
+
+# ---
+
+
+def write_row(data: IO, converters: List[Callable], row, lob_type: type, read_size: int):
+    """ Writes a row of values with the column converters, streaming any LOB locators """
+
+    data.write(_FIELDS.pack(len(converters)))
+    for converter, col in zip(converters, row):
+        if col is None:
+            data.write(_NULL)
+        elif isinstance(col, lob_type):
+            write_lob(data, col, read_size)
+        else:
+            data.write(converter(col))
+
+
+# -----------------------------------------------
+# End.
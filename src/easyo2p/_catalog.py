@@ -0,0 +1,200 @@
+"""
+
+easyo2p: _catalog.py
+Oracle dictionary queries, fetched once for the whole schema and indexed by object name
+
+"""
+
+# -----------------------------------------------
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Tuple
+import datetime
+import gzip
+import json
+
+import easyo2p
+if TYPE_CHECKING:
+    from easyo2p import O2P
+
+# -----------------------------------------------
+
+SNAPSHOT_VERSION = 1
+
+# Each query's first column is the name the records are indexed by
+
+QUERIES = {
+    'col_comments': (
+        "SELECT table_name, column_name, REPLACE(comments, '''', '''''') comments"
+        "  FROM user_col_comments"
+        " WHERE comments IS NOT NULL"
+    ),
+    'columns': (
+        "SELECT table_name, column_name, data_type, data_length, data_precision, data_scale,"
+        "       nullable, column_id"
+        "  FROM user_tab_columns"
+        " ORDER BY table_name, column_id"
+    ),
+    'foreign_keys': (
+        'SELECT uc.table_name, uc.constraint_name, ruc.table_name r_table_name,'
+        '       ucc.column_name, rucc.column_name r_column_name, uc.delete_rule'
+        '  FROM user_constraints uc,'
+        '       user_cons_columns ucc,'
+        '       user_constraints ruc,'
+        '       user_cons_columns rucc'
+        ' WHERE uc.constraint_name = ucc.constraint_name'
+        '   AND uc.r_constraint_name = ruc.constraint_name'
+        '   AND ruc.constraint_name = rucc.constraint_name'
+        '   AND ucc.position = rucc.position'
+        ' ORDER BY uc.table_name, uc.constraint_name, ucc.position'
+    ),
+    'identity_columns': (
+        "SELECT table_name, column_name, sequence_name"
+        "  FROM user_tab_identity_cols"
+    ),
+    'index_columns': (
+        "SELECT aic.table_name, aic.index_name, aic.column_name"
+        "  FROM all_ind_columns aic"
+        " WHERE aic.table_owner = USER"
+        " ORDER BY aic.table_name, aic.index_name, aic.column_position"
+    ),
+    'indexes': (
+        "SELECT ui.table_name, ui.index_name, uic.column_name, ui.tablespace_name"
+        "  FROM user_indexes ui, user_ind_columns uic"
+        " WHERE ui.uniqueness = 'NONUNIQUE'"
+        "   AND ui.index_type = 'NORMAL'"
+        "   AND ui.index_name = uic.index_name"
+        " ORDER BY ui.table_name, ui.index_name, uic.column_position"
+    ),
+    'keys': (
+        "SELECT uc.table_name, uc.constraint_name, uc.constraint_type, ucc.column_name,"
+        "       ui.tablespace_name"
+        "  FROM user_constraints uc, user_cons_columns ucc, user_indexes ui"
+        " WHERE uc.constraint_type IN ('P','U')"
+        "   AND uc.constraint_name = ucc.constraint_name"
+        "   AND uc.index_name = ui.index_name"
+        " ORDER BY uc.table_name, uc.constraint_name, ucc.position"
+    ),
+    'sequences': (
+        "SELECT sequence_name, increment_by, last_number"
+        "  FROM user_sequences"
+        " ORDER BY sequence_name"
+    ),
+    'tab_comments': (
+        "SELECT table_name, REPLACE(comments, '''', '''''') comments"
+        "  FROM user_tab_comments"
+        " WHERE comments IS NOT NULL"
+    ),
+    'table_sizes': (
+        "SELECT ut.table_name, ut.num_rows, us.bytes"
+        "  FROM user_tables ut,"
+        "       (SELECT segment_name, SUM(bytes) bytes"
+        "          FROM user_segments"
+        "         GROUP BY segment_name) us"
+        " WHERE us.segment_name(+) = ut.table_name"
+    ),
+    'tables': (
+        "SELECT ut.table_name, ut.tablespace_name"
+        "  FROM user_tables ut"
+        " WHERE ut.status = 'VALID'"
+        "   AND tablespace_name IS NOT NULL"
+        "   AND SUBSTR(table_name,1,4) != 'SYS_'"
+        " ORDER BY 1"
+    ),
+    'trigger_source': (
+        "SELECT us.name, us.text"
+        "  FROM user_source us"
+        " WHERE us.type = 'TRIGGER'"
+        " ORDER BY us.name, us.line"
+    ),
+    'triggers': (
+        "SELECT ut.table_name,"
+        "       ut.trigger_name,"
+        "       ut.trigger_type,"
+        "       ut.triggering_event,"
+        "       ut.when_clause"
+        "  FROM user_triggers ut"
+        " WHERE ut.status = 'ENABLED'"
+        "   AND ut.base_object_type = 'TABLE'"
+        " ORDER BY ut.table_name, ut.trigger_name"
+    )
+}
+
+# Queries for a single object's records, streamed rather than held for the whole schema,
+# used for the larger views which are only iterated
+
+OBJECT_QUERIES = {
+    'trigger_source': (
+        "SELECT us.name, us.text"
+        "  FROM user_source us"
+        " WHERE us.type = 'TRIGGER'"
+        "   AND us.name = :name"
+        " ORDER BY us.line"
+    )
+}
+
+# -----------------------------------------------
+
+
+def fetch(o2p: O2P, name: str) -> Tuple[Dict[str, List], Dict]:
+    """
+    Runs a catalog query for the whole schema
+
+    :param o2p: the O2P object
+    :param name: the name of the catalog query
+    :return: tuple of the records indexed by object name, and the column positions
+    """
+
+    records, cols = o2p.oracle_iter(QUERIES[name])
+
+    data = {}
+    for record in records:
+        data.setdefault(record[0], []).append(record)
+
+    return data, cols
+
+
+# -----------------------------------------------
+
+
+def load_snapshot(filename: str) -> Dict:
+    """
+    Loads a catalog snapshot file
+
+    :param filename: the snapshot filename, a gzip compressed json file
+    :return: the catalog, as held by the O2P object
+    """
+
+    with gzip.open(filename, 'rt', encoding='utf-8') as file:
+        snapshot = json.load(file)
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f'Unsupported snapshot version: "{snapshot.get("version")}"')
+
+    return {name: (i['records'], i['cols']) for name, i in snapshot['catalog'].items()}
+
+
+# ---
+
+
+def save_snapshot(filename: str, catalog: Dict):
+    """
+    Saves the catalog to a snapshot file
+
+    :param filename: the snapshot filename, a gzip compressed json file
+    :param catalog: the catalog, as held by the O2P object
+    """
+
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'easyo2p': easyo2p.__version__,
+        'created': datetime.datetime.now().isoformat(),
+        'catalog': {name: {'records': i[0], 'cols': i[1]} for name, i in catalog.items()}
+    }
+
+    with gzip.open(filename, 'wt', encoding='utf-8') as file:
+        json.dump(snapshot, file)
+
+
+# -----------------------------------------------
+# End.
@@ -8,9 +8,23 @@ Constant values used throughout the packge to reference parameter keys and proce
 # -----------------------------------------------
 #  Parameters
 
+BATCH_BYTES = 'batch_bytes'
+BATCH_MIN_ROWS = 'batch_min_rows'
+BATCH_SECONDS = 'batch_seconds'
+BULK_LOAD = 'bulk_load'
+BULK_LOAD_WORK_MEM = 'bulk_load_work_mem'
+CHUNK_BYTES = 'chunk_bytes'
+CHUNK_JOBS = 'chunk_jobs'
+CHUNK_METHOD = 'chunk_method'
+CHUNK_ROWS = 'chunk_rows'
 COLUMN_DATATYPES = 'column_datatypes'
 COLUMN_REORDER = 'column_reorder'
+COMMIT_BATCHES = 'commit_batches'
+COMMIT_BYTES = 'commit_bytes'
 CONSOLE = 'console'
+DATA_MODE = 'data_mode'
+DEFER_FK_VALIDATION = 'defer_fk_validation'
+DEFER_KEYS = 'defer_keys'
 DROP_SCHEMA = 'drop_schema'
 ENCODING = 'encoding'
 ETL_COMMENTS = 'etl_comments'
@@ -20,16 +34,40 @@ ETL_FILES = 'etl_files'
 ETL_MIGRATE = 'etl_migrate'
 ETL_TRIGGERS = 'etl_triggers'
 EXCLUDE = 'exclude'
+FILE_COMPRESSION = 'file_compression'
+FILE_COMPRESSION_DDL = 'file_compression_ddl'
+FILE_DATA_MODE = 'file_data_mode'
+FILE_SEGMENT_BYTES = 'file_segment_bytes'
+FILE_SEGMENT_ROWS = 'file_segment_rows'
+FK_INDEXES = 'fk_indexes'
+INDEX_JOBS = 'index_jobs'
+INDEX_WORK_MEM = 'index_work_mem'
+INDEX_WORKERS = 'index_workers'
 INSERT_ROWS = 'insert_rows'
+JOBS = 'jobs'
+LOB_INLINE_SIZE = 'lob_inline_size'
+MAINTENANCE = 'maintenance'
+MAINTENANCE_JOBS = 'maintenance_jobs'
+ORACLE_ARRAYSIZE = 'oracle_arraysize'
 ORACLE_CONN = 'oracle_conn'
 ORACLE_INSTANT_CLIENT = 'oracle_instant_client'
+ORACLE_PREFETCH_ROWS = 'oracle_prefetch_rows'
+ORACLE_STMT_CACHE_SIZE = 'oracle_stmt_cache_size'
+PIPELINE_DEPTH = 'pipeline_depth'
 POSTGRES_CONN = 'postgres_conn'
 POSTGRES_SCHEMA = 'postgres_schema'
+REFRESH = 'refresh'
+REFRESH_COLUMNS = 'refresh_columns'
+REFRESH_STATE = 'refresh_state'
 RENAME = 'rename'
+RESUME = 'resume'
 SEQUENCES = 'sequences'
+SNAPSHOT_LOAD = 'snapshot_load'
+SNAPSHOT_SAVE = 'snapshot_save'
 TABLES = 'tables'
 TABLESPACE_MAP = 'tablespace_map'
 TARGET_PATH = 'target_path'
+TRANSACTIONS = 'transactions'
 TRIGGERS = 'triggers'
 
 # ---
@@ -42,6 +80,49 @@ SEQUENCE = 'SEQUENCE'
 TABLE = 'TABLE'
 TRIGGER = 'TRIGGER'
 
+# ---
+#  Chunk methods
+
+KEY = 'KEY'
+ROWID = 'ROWID'
+
+# ---
+#  Data modes
+
+BINARY = 'BINARY'
+COPY = 'COPY'
+INSERT = 'INSERT'
+
+# ---
+#  File compressions
+
+GZIP = 'GZIP'
+ZSTD = 'ZSTD'
+
+# ---
+#  Foreign key index modes
+
+CREATE = 'CREATE'
+REPORT = 'REPORT'
+
+# ---
+#  Maintenance modes
+
+ANALYZE = 'ANALYZE'
+VACUUM = 'VACUUM'
+
+# ---
+#  Column alias prefix for LOBs fetched as locators, rather than inline
+
+LOB_LOCATOR = 'O2P_LOB_'
+
+# ---
+#  Transaction modes, along with TABLE
+
+AUTOCOMMIT = 'AUTOCOMMIT'
+BATCH = 'BATCH'
+SINGLE = 'SINGLE'
+
 # ---
 
 PRE = '1'
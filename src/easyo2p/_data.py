@@ -1,7 +1,7 @@
 """
 
 easyo2p: _data.py
-Extension of the _main.o2p class for creating insert statements
+Extension of the _main.o2p class for creating insert statements and copying data
 
 """
 
@@ -11,60 +11,777 @@ Extension of the _main.o2p class for creating insert statements
 # -----------------------------------------------
 
 from __future__ import annotations
-from typing import TYPE_CHECKING, List
+from typing import IO, TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
 import datetime
+import io
+import math
+import queue
+import tempfile
+import threading
+import time
 
 import cx_Oracle
 
-from easyo2p import TABLE
+from easyo2p import (
+    BATCH, BATCH_BYTES, BATCH_MIN_ROWS, BATCH_SECONDS, BINARY, BULK_LOAD, CHUNK_BYTES,
+    CHUNK_METHOD, CHUNK_ROWS, COMMIT_BATCHES, COMMIT_BYTES, COPY, DATA_MODE, ETL_FILES,
+    ETL_MIGRATE, FILE_DATA_MODE, INSERT, KEY, LOB_INLINE_SIZE, LOB_LOCATOR, PIPELINE_DEPTH,
+    REFRESH, ROWID, SINGLE, TABLE, TRANSACTIONS
+)
+import easyo2p._binary as o2p_binary
+import easyo2p._refresh as o2p_refresh
 if TYPE_CHECKING:
     from easyo2p import O2P
 
 # -----------------------------------------------
 
+# Characters escaped in the COPY text format, NUL characters are not valid in PostgreSQL text
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\n': '\\n', '\r': '\\r', '\t': '\\t', '\x00': None})
 
-def main(o2p: O2P, table_name: str, columns: List, insert_rows: int):
-    """ Processes export for a specified table """
+# Extended ROWID base 64 digits, and the highest row number used for the end of a range
+_ROWID_DIGITS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+_ROWID_MAX_ROW = 32767
 
-    query = f"SELECT {','.join(columns)} FROM {table_name}"
-    cursor = o2p.get_oracle_connection().cursor()
-    cursor.execute(query)
+# LOB locators are read in pieces of this many characters or bytes, into buffers which are
+# held in memory up to the spool size, then written to a temporary file
+_LOB_READ_SIZE = 1_048_576
+_LOB_SPOOL_SIZE = 67_108_864
+
+# Oracle LOB datatypes, which can be fetched as locators
+_LOB_TYPES = ['BLOB', 'CLOB', 'NCLOB']
+
+# Weight of the latest batch in the measured row size and latency, used to size the next batch
+_BATCH_WEIGHT = 0.5
+
+# Marks the end of the batches passed between pipeline stages
+_DONE = object()
+
+# -----------------------------------------------
+
+
+def _copy_value(col) -> str:
+    """ Converts a value of any type to the COPY text format """
+
+    if col is None:
+        return '\\N'
+    if isinstance(col, bytes):
+        return _copy_bytes(col)
+    if isinstance(col, (str, cx_Oracle.LOB)):
+        return _copy_text(col)
+    if isinstance(col, datetime.datetime):
+        return _copy_datetime(col)
+    return str(col)
+
+
+# ---
+
+
+def _copy_bytes(col) -> str:
+    """ Converts bytes to the COPY text format """
+
+    return '\\\\x' + col.hex()
+
+
+# ---
+
+
+def _copy_datetime(col) -> str:
+    """ Converts a datetime to the COPY text format """
+
+    return col.strftime('%Y-%m-%d %H:%M:%S')
+
+
+# ---
+
+
+def _copy_text(col) -> str:
+    """ Converts a string or LOB to the COPY text format """
+
+    return str(col).translate(_COPY_ESCAPES)
+
+
+# ---
+
+
+def _copy_lob(data: IO, lob):
+    """ Writes a LOB locator's value in the COPY text format, reading it in pieces """
+
+    if lob.type == cx_Oracle.DB_TYPE_BLOB:
+        data.write('\\\\x')
+
+    offset = 1
+    while piece := lob.read(offset, _LOB_READ_SIZE):
+        offset += len(piece)
+        data.write(piece.hex() if isinstance(piece, bytes) else piece.translate(_COPY_ESCAPES))
+
+
+# -----------------------------------------------
+
+
+def _insert_value(col) -> str:
+    """ Converts a value of any type to an insert statement literal """
+
+    if col is None:
+        return 'NULL'
+    if isinstance(col, bytes):
+        return _insert_bytes(col)
+    if isinstance(col, (str, cx_Oracle.LOB)):
+        return _insert_text(col)
+    if isinstance(col, datetime.datetime):
+        return _insert_datetime(col)
+    return str(col)
+
+
+# ---
+
+
+def _insert_bytes(col) -> str:
+    """ Converts bytes, or a BLOB locator, to an insert statement literal """
+
+    if isinstance(col, cx_Oracle.LOB):
+        col = col.read()
+    return f"DECODE('{col.hex()}', 'hex')"
+
+
+# ---
+
+
+def _insert_datetime(col) -> str:
+    """ Converts a datetime to an insert statement literal """
+
+    return f"TO_TIMESTAMP('{col.strftime('%Y%m%d%H%M%S')}','YYYYMMDDHH24MISS')"
+
+
+# ---
+
+
+def _insert_text(col) -> str:
+    """ Converts a string or LOB to an insert statement literal """
+
+    return "'" + str(col).replace("'", "''") + "'"
+
+
+# -----------------------------------------------
+
+# Oracle column types, with their COPY text and insert statement converters
+_TYPE_CONVERTERS = [
+    (
+        [cx_Oracle.DB_TYPE_NUMBER, cx_Oracle.DB_TYPE_BINARY_DOUBLE,
+         cx_Oracle.DB_TYPE_BINARY_FLOAT, cx_Oracle.DB_TYPE_BINARY_INTEGER],
+        str, str
+    ),
+    (
+        [cx_Oracle.DB_TYPE_CHAR, cx_Oracle.DB_TYPE_NCHAR, cx_Oracle.DB_TYPE_VARCHAR,
+         cx_Oracle.DB_TYPE_NVARCHAR, cx_Oracle.DB_TYPE_LONG, cx_Oracle.DB_TYPE_CLOB,
+         cx_Oracle.DB_TYPE_NCLOB],
+        _copy_text, _insert_text
+    ),
+    (
+        [cx_Oracle.DB_TYPE_DATE, cx_Oracle.DB_TYPE_TIMESTAMP],
+        _copy_datetime, _insert_datetime
+    ),
+    (
+        [cx_Oracle.DB_TYPE_RAW, cx_Oracle.DB_TYPE_LONG_RAW, cx_Oracle.DB_TYPE_BLOB],
+        _copy_bytes, _insert_bytes
+    )
+]
+
+# ---
+
+
+def _nullable(converter: Callable, null: str) -> Callable:
+    """ Wraps a typed converter to return the null value for None """
+
+    if converter in [_copy_value, _insert_value]:
+        return converter
+    return lambda col: null if col is None else converter(col)
+
+
+# ---
+
+
+def _get_value_converters(description: List, insert: bool) -> List[Callable]:
+    """ Gets the insert or copy converter for each column, from the cursor description """
+
+    converters = []
+    for column in description:
+        for db_types, copy_converter, insert_converter in _TYPE_CONVERTERS:
+            if column[1] in db_types:
+                break
+        else:
+            copy_converter, insert_converter = _copy_value, _insert_value
+        converters.append(
+            _nullable(insert_converter, 'NULL') if insert else _nullable(copy_converter, '\\N')
+        )
+    return converters
+
+
+# -----------------------------------------------
+
+
+def _encode_copy(converters: List, rows: List, lobs: bool = False) -> IO:
+    """ Encodes a batch of rows in the COPY text format, streaming any LOB locators """
+
+    if not lobs:
+        data = io.StringIO()
+        for row in rows:
+            data.write('\t'.join([converter(col) for converter, col in zip(converters, row)]))
+            data.write('\n')
+        return data
+
+    data = tempfile.SpooledTemporaryFile(_LOB_SPOOL_SIZE, 'w+', encoding='utf-8')
+    for row in rows:
+        for i, (converter, col) in enumerate(zip(converters, row)):
+            if i:
+                data.write('\t')
+            if isinstance(col, cx_Oracle.LOB):
+                _copy_lob(data, col)
+            else:
+                data.write(converter(col))
+        data.write('\n')
+    return data
+
+
+# ---
+
+
+def _encode_copy_binary(rows: List, converters: List, lobs: bool = False) -> IO:
+    """ Encodes a batch of rows in the binary COPY format, streaming any LOB locators """
+
+    data = tempfile.SpooledTemporaryFile(_LOB_SPOOL_SIZE) if lobs else io.BytesIO()
+    data.write(o2p_binary.HEADER)
+    for row in rows:
+        if lobs:
+            o2p_binary.write_row(data, converters, row, cx_Oracle.LOB, _LOB_READ_SIZE)
+        else:
+            data.write(o2p_binary.encode_row(converters, row))
+    data.write(o2p_binary.TRAILER)
+    return data
+
+
+# ---
+
+
+def _get_converters(o2p: O2P, table_name: str, columns: List) -> Optional[List]:
+    """ Gets the binary encoders for the columns, None if any datatype is not supported """
+
+    datatypes = o2p.get_parameter('_datatypes')
+    converters = []
+    for column_name in columns:
+        datatype = datatypes.get(f'{table_name}.{column_name}', '')
+        if not (converter := o2p_binary.get_converter(datatype)):
+            o2p.log(f"Binary copy not supported: {table_name}.{column_name}, {datatype}")
+            return None
+        converters.append(converter)
+    return converters
+
+
+# -----------------------------------------------
+
+
+def _get_key_chunks(o2p: O2P, table_name: str, number_of_chunks: int) -> List[Dict]:
+    """ Splits the table into ranges of a single column numeric primary key """
+
+    keys, cols = o2p.catalog_query('keys', table_name)
+    key_columns = [i[cols['column_name']] for i in keys if i[cols['constraint_type']] == 'P']
+    columns, cols = o2p.catalog_query('columns', table_name)
+    data_types = {i[cols['column_name']]: i[cols['data_type']] for i in columns}
+
+    if len(key_columns) != 1 or data_types.get(key_columns[0]) != 'NUMBER':
+        return []
+
+    column_name = key_columns[0]
+    query = f"SELECT MIN({column_name}), MAX({column_name}) FROM {table_name}"
+    low, high = o2p.oracle_query(query)[0]
+    if low is None:
+        return []
+
+    if isinstance(low, int) and isinstance(high, int):
+        bounds = [low + (high - low + 1) * i // number_of_chunks for i in range(number_of_chunks)]
+    else:
+        bounds = [low + (high - low) * i / number_of_chunks for i in range(number_of_chunks)]
+    bounds = sorted(set(bounds))
+
+    return [{
+        'chunk': i + 1,
+        'where': (
+            f" WHERE {column_name} >= :low"
+            + (f" AND {column_name} < :high" if i + 1 < len(bounds) else '')
+        ),
+        'binds': {'low': bound} if i + 1 == len(bounds) else {'low': bound, 'high': bounds[i + 1]}
+    } for i, bound in enumerate(bounds)]
+
+
+# ---
+
+
+def _get_rowid(data_object_id: int, relative_fno: int, block_id: int, row: int) -> str:
+    """ Creates an extended ROWID, as DBMS_ROWID.ROWID_CREATE """
+
+    rowid = ''
+    for value, digits in [(data_object_id, 6), (relative_fno, 3), (block_id, 6), (row, 3)]:
+        rowid += ''.join([_ROWID_DIGITS[(value >> (6 * i)) & 63] for i in reversed(range(digits))])
+    return rowid
+
+
+# ---
+
+
+def _get_rowid_chunks(o2p: O2P, table_name: str, number_of_chunks: int) -> List[Dict]:
+    """ Splits the table into ROWID ranges, from groups of its extents """
+
+    query = (
+        "SELECT uo.data_object_id, de.relative_fno, de.block_id, de.blocks"
+        "  FROM dba_extents de, user_objects uo"
+        " WHERE de.owner = USER"
+        "   AND de.segment_name = :table_name"
+        "   AND de.segment_type = 'TABLE'"
+        "   AND uo.object_name = de.segment_name"
+        "   AND uo.object_type = 'TABLE'"
+        " ORDER BY de.relative_fno, de.block_id"
+    )
+
+    try:
+        extents = o2p.oracle_query(query, binds={'table_name': table_name})
+    except cx_Oracle.DatabaseError:
+        o2p.log(f"Unable to read the extents of {table_name}, access to dba_extents required")
+        return []
+
+    target_blocks = sum([i[3] for i in extents]) / number_of_chunks
+    groups = []
+    blocks = 0
+
+    for extent in extents:
+        if blocks >= target_blocks * len(groups):
+            groups.append([extent, extent])
+        groups[-1][1] = extent
+        blocks += extent[3]
+
+    return [{
+        'chunk': i + 1,
+        'where': " WHERE ROWID BETWEEN CHARTOROWID(:low) AND CHARTOROWID(:high)",
+        'binds': {
+            'low': _get_rowid(first[0], first[1], first[2], 0),
+            'high': _get_rowid(last[0], last[1], last[2] + last[3] - 1, _ROWID_MAX_ROW)
+        }
+    } for i, (first, last) in enumerate(groups)]
+
+
+# ---
+
+
+def get_chunks(o2p: O2P, table_name: str) -> List[Dict]:
+    """
+    Splits a large table into ranges, by primary key or ROWID, that can be loaded concurrently.
+    Tables are split when they have more rows than ``chunk_rows``,
+    or a larger segment than ``chunk_bytes``, using the Oracle statistics.
+
+    :param o2p: the O2P object
+    :param table_name: the Oracle table name
+    :return: the chunks, each with a where clause and bind values, or a single empty chunk
+    """
+
+    chunk_rows = o2p.get_parameter(CHUNK_ROWS)
+    chunk_bytes = o2p.get_parameter(CHUNK_BYTES)
+    if not (chunk_rows or chunk_bytes):
+        return [{}]
+
+    records, cols = o2p.catalog_query('table_sizes', table_name)
+    if not records:
+        return [{}]
+
+    num_rows, num_bytes = records[0][cols['num_rows']], records[0][cols['bytes']]
+    number_of_chunks = max(
+        math.ceil(num_rows / chunk_rows) if chunk_rows and num_rows else 1,
+        math.ceil(num_bytes / chunk_bytes) if chunk_bytes and num_bytes else 1
+    )
+    if number_of_chunks <= 1:
+        return [{}]
+
+    chunks = []
+    if o2p.get_parameter(CHUNK_METHOD) in [None, KEY]:
+        chunks = _get_key_chunks(o2p, table_name, number_of_chunks)
+    if not chunks and o2p.get_parameter(CHUNK_METHOD) in [None, ROWID]:
+        chunks = _get_rowid_chunks(o2p, table_name, number_of_chunks)
+
+    if len(chunks) <= 1:
+        return [{}]
+
+    o2p.log(f"{table_name} split into {len(chunks)} chunks")
+    return chunks
+
+
+# -----------------------------------------------
+
+
+def _encode_insert(insert_cmd: str, converters: List, rows: List, conflict: str = '') -> str:
+    """ Creates the insert statement for a batch of rows, with the ON CONFLICT clause if any """
+
+    values = ',\n'.join([
+        f"({','.join([converter(col) for converter, col in zip(converters, row)])})" for row in rows
+    ])
+    cmd = f"{insert_cmd} VALUES \n{values}{conflict}; \n"
+    return cmd.replace('\x00', '')
+
+
+# -----------------------------------------------
+
+
+def _get_batch(o2p: O2P, table_name: str, insert_rows: int) -> Dict:
+    """
+    Creates the batch sizing for a table.
+    With a byte budget the first batch is sized from the column widths in the dictionary,
+    then each batch from the measured size and latency of the previous ones.
+    Otherwise batches are always insert_rows.
+    """
+
+    batch = {
+        'rows': insert_rows,
+        'max_rows': insert_rows,
+        'min_rows': min(o2p.get_parameter(BATCH_MIN_ROWS), insert_rows),
+        'bytes': o2p.get_parameter(BATCH_BYTES),
+        'seconds': o2p.get_parameter(BATCH_SECONDS),
+        'row_bytes': 0,
+        'row_seconds': 0,
+        'fetch_seconds': 0,
+        'encode_seconds': 0
+    }
+
+    if batch['bytes']:
+        records, cols = o2p.catalog_query('columns', table_name)
+        batch['row_bytes'] = sum([(i[cols['data_length']] or 0) + 1 for i in records]) or 1
+        _resize_batch(batch)
+
+    return batch
+
+
+# ---
+
+
+def _measure_batch(batch: Dict, rows: int, encoded_bytes: int, write_seconds: float):
+    """ Records the size and latency of a written batch, and resizes the next one """
+
+    if not (batch['bytes'] and rows):
+        return
+
+    seconds = batch['fetch_seconds'] + batch['encode_seconds'] + write_seconds
+    batch['row_bytes'] += (encoded_bytes / rows - batch['row_bytes']) * _BATCH_WEIGHT
+    batch['row_seconds'] = (
+        batch['row_seconds'] + (seconds / rows - batch['row_seconds']) * _BATCH_WEIGHT
+        if batch['row_seconds'] else seconds / rows
+    )
+    _resize_batch(batch)
+
+
+# ---
+
+
+def _resize_batch(batch: Dict):
+    """ Sizes the next batch to the byte budget and latency target, within the row limits """
+
+    rows = batch['bytes'] / max(batch['row_bytes'], 1)
+    if batch['seconds'] and batch['row_seconds']:
+        rows = min(rows, batch['seconds'] / batch['row_seconds'])
+    batch['rows'] = int(max(batch['min_rows'], min(batch['max_rows'], rows)))
+
+
+# ---
+
+
+def _fetch(cursor, batch: Dict) -> Iterator[List]:
+    """ Fetches the rows in batches, of the current batch size """
 
     while True:
-        rows = cursor.fetchmany(insert_rows)
+        start = time.perf_counter()
+        rows = cursor.fetchmany(batch['rows'])
+        batch['fetch_seconds'] = time.perf_counter() - start
         if not rows:
             break
-        rows_to_insert = []
+        yield rows
+
+
+# ---
+
+
+def _get_lob_positions(o2p: O2P, table_name: str, columns: List) -> List[int]:
+    """ Gets the positions of the LOB columns, when large LOBs are fetched as locators """
+
+    if not o2p.get_parameter(LOB_INLINE_SIZE):
+        return []
 
+    records, cols = o2p.catalog_query('columns', table_name)
+    lobs = [i[cols['column_name']] for i in records if i[cols['data_type']] in _LOB_TYPES]
+    return [i for i, column_name in enumerate(columns) if column_name in lobs]
+
+
+# ---
+
+
+def _merge_lobs(batches: Iterator[List], lob_positions: List[int]) -> Iterator[List]:
+    """
+    Merges the LOB locator columns, selected after the table columns, into the rows.
+    Each LOB is either inline, in its own column, or a locator, in the added column.
+    """
+
+    width = -len(lob_positions)
+    for rows in batches:
+        merged = []
         for row in rows:
-            cols = []
-            for col in row:
-                if col is None:
-                    cols.append('NULL')
-                elif isinstance(col, bytes):
-                    cols.append(f"DECODE('{col.hex()}', 'hex')")
-                elif isinstance(col, (str, cx_Oracle.LOB)):
-                    cols.append("'" + str(col).replace("'", "''") + "'")
-                elif isinstance(col, datetime.datetime):
-                    cols.append(
-                        f"TO_TIMESTAMP('{col.strftime('%Y%m%d%H%M%S')}','YYYYMMDDHH24MISS')"
-                    )
-                else:
-                    cols.append(str(col))
-            rows_to_insert.append(f"({','.join(cols)})")
-
-        # ---
-
-        pgs_table_name = o2p.rename_object(TABLE, table_name)
-        pgs_columns = ','.join([o2p.rename_column(table_name, i) for i in columns])
-
-        values = ',\n'.join(rows_to_insert)
-        cmd = (
-            f"INSERT INTO %%schema%%.{pgs_table_name}"
-            f"({pgs_columns}) VALUES \n{values}; \n"
+            locators = row[width:]
+            row = list(row[:width])
+            for position, locator in zip(lob_positions, locators):
+                if locator is not None:
+                    row[position] = locator
+            merged.append(row)
+        yield merged
+
+
+# ---
+
+
+def _pipeline(batches: Iterator, encode: Callable, write: Callable, depth: int):
+    """
+    Runs the fetch, encode and write stages, each in its own thread when depth is set,
+    passing batches between them through queues holding up to depth batches.
+    Writing stays on the calling thread, as the ETL file and connections belong to it.
+    """
+
+    if not depth:
+        for batch in batches:
+            write(encode(batch))
+        return
+
+    failed = threading.Event()
+    errors = []
+    fetched = queue.Queue(depth)
+    encoded = queue.Queue(depth)
+
+    def get(source: queue.Queue):
+        while not failed.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def put(target: queue.Queue, item):
+        while not failed.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def stage(function: Callable, items: Iterator, target: queue.Queue):
+        try:
+            for item in items:
+                if failed.is_set():
+                    break
+                put(target, function(item))
+        except BaseException as ex:  # pylint: disable=broad-except   # Raised by the caller
+            errors.append(ex)
+            failed.set()
+        finally:
+            put(target, _DONE)
+
+    threads = [
+        threading.Thread(target=stage, args=(lambda i: i, batches, fetched)),
+        threading.Thread(target=stage, args=(encode, iter(lambda: get(fetched), _DONE), encoded))
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while (item := get(encoded)) is not _DONE:
+            write(item)
+    except BaseException:
+        failed.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+# -----------------------------------------------
+
+
+def _get_plan(o2p: O2P, table_name: str, columns: List, description: List, chunk: Dict) -> Dict:
+    """
+    Compiles the load plan for a table, once, before its rows are processed.
+    Holds the statements and the converter for each column, for each way the data is written.
+    """
+
+    pgs_table_name = o2p.rename_object(TABLE, table_name)
+    pgs_columns = ','.join([o2p.rename_column(table_name, i) for i in columns])
+
+    # Refreshed rows are upserted, which only insert statements can do.
+    # When the files hold copy data, it is also copied to PostgreSQL rather than inserted.
+    refresh = o2p.get_parameter(REFRESH)
+    data_mode = INSERT if refresh else o2p.get_parameter(DATA_MODE)
+    file_copy = (
+        o2p.get_parameter(ETL_FILES) and o2p.get_parameter(FILE_DATA_MODE) == COPY and not refresh
+    )
+    copy = o2p.get_parameter(ETL_MIGRATE) and (data_mode in [BINARY, COPY] or file_copy)
+    insert = (
+        (o2p.get_parameter(ETL_FILES) and not file_copy)
+        or (o2p.get_parameter(ETL_MIGRATE) and not copy)
+    )
+
+    plan = {
+        'copy_cmd': f"COPY %%schema%%.{pgs_table_name}({pgs_columns}) FROM STDIN",
+        'file_copy_cmd': f"COPY %%schema%%.{pgs_table_name}({pgs_columns}) FROM stdin;",
+        'insert_cmd': f"INSERT INTO %%schema%%.{pgs_table_name}({pgs_columns})",
+        'conflict': (
+            o2p_refresh.get_conflict(o2p, table_name, columns) if o2p.get_parameter(REFRESH)
+            else ''
+        ),
+        'binary': None,
+        'copy': None,
+        'insert': _get_value_converters(description, True) if insert else None,
+        'migrate_copy': copy,
+        'migrate_inserts': not copy,
+        'file_copy': file_copy,
+        'lobs': False,
+        'batch': None,
+        'commit': o2p.get_parameter(TRANSACTIONS) == BATCH,
+        'uncommitted_batches': 0,
+        'uncommitted_bytes': 0
+    }
+
+    if copy and data_mode == BINARY:
+        plan['binary'] = _get_converters(o2p, table_name, columns)
+    if (not plan['binary'] and copy) or file_copy:
+        plan['copy'] = _get_value_converters(description, False)
+
+    # Rows can be frozen when the table was created in the same transaction, by the same session
+    copy_options = ['FORMAT BINARY'] if plan['binary'] else []
+    if (
+            o2p.get_parameter(BULK_LOAD) and not chunk
+            and o2p.get_parameter(TRANSACTIONS) in [SINGLE, TABLE]
+    ):
+        copy_options.append('FREEZE')
+    if copy_options:
+        plan['copy_cmd'] += f" ({', '.join(copy_options)})"
+
+    return plan
+
+
+# ---
+
+
+def _encode(plan: Dict, rows: List) -> tuple:
+    """ Encodes a batch of rows for each way the data is written """
+
+    start = time.perf_counter()
+
+    text_data = _encode_copy(plan['copy'], rows, plan['lobs']) if plan['copy'] else None
+    if plan['binary']:
+        copy_data = _encode_copy_binary(rows, plan['binary'], plan['lobs'])
+    else:
+        copy_data = text_data if plan['migrate_copy'] else None
+    file_data = text_data if plan['file_copy'] else None
+
+    if plan['insert']:
+        insert_data = _encode_insert(plan['insert_cmd'], plan['insert'], rows, plan['conflict'])
+    else:
+        insert_data = None
+
+    plan['batch']['encode_seconds'] = time.perf_counter() - start
+    return len(rows), copy_data, file_data, insert_data
+
+
+# ---
+
+
+def _write(o2p: O2P, plan: Dict, encoded: tuple):
+    """ Writes an encoded batch of rows to PostgreSQL and the ETL file """
+
+    start = time.perf_counter()
+    rows, copy_data, file_data, insert_data = encoded
+    encoded_bytes = 0
+
+    if copy_data is not None:
+        encoded_bytes = copy_data.tell()
+        plan['uncommitted_bytes'] += encoded_bytes
+        o2p.postgresql_copy(plan['copy_cmd'], copy_data)
+    if file_data is not None:
+        encoded_bytes = max(encoded_bytes, file_data.tell())
+        o2p._etl_segment(rows, file_data.tell())  # pylint: disable=protected-access
+        o2p.postgresql_copy(plan['file_copy_cmd'], file_data, migrate=False, etl_file=True)
+    for data in [copy_data, file_data]:
+        if data is not None:
+            data.close()
+    if insert_data is not None:
+        encoded_bytes = max(encoded_bytes, len(insert_data))
+        o2p._etl_segment(rows, len(insert_data))  # pylint: disable=protected-access
+        if plan['migrate_inserts']:
+            plan['uncommitted_bytes'] += len(insert_data)
+        o2p.postgresql_cmd(insert_data, migrate=plan['migrate_inserts'])
+
+    if plan['commit']:
+        plan['uncommitted_batches'] += 1
+        commit_bytes = o2p.get_parameter(COMMIT_BYTES)
+        if (
+                plan['uncommitted_batches'] >= o2p.get_parameter(COMMIT_BATCHES)
+                or (commit_bytes and plan['uncommitted_bytes'] >= commit_bytes)
+        ):
+            o2p.postgresql_commit()
+            plan['uncommitted_batches'] = plan['uncommitted_bytes'] = 0
+
+    _measure_batch(plan['batch'], rows, encoded_bytes, time.perf_counter() - start)
+
+
+# -----------------------------------------------
+
+
+def main(o2p: O2P, table_name: str, columns: List, insert_rows: int, chunk: Dict = None):
+    """ Processes export for a specified table, or a chunk of it """
+
+    chunk = chunk or {}
+    where, binds = o2p_refresh.get_where(o2p, table_name, chunk)
+
+    # LOBs larger than the inline size are selected again, as locators, after the columns
+    select = list(columns)
+    lob_positions = _get_lob_positions(o2p, table_name, columns)
+    for i, position in enumerate(lob_positions):
+        column_name = columns[position]
+        select[position] = (
+            f"CASE WHEN DBMS_LOB.GETLENGTH({column_name}) <= :lob_inline_size"
+            f" THEN {column_name} END {column_name}"
+        )
+        select.append(
+            f"CASE WHEN DBMS_LOB.GETLENGTH({column_name}) > :lob_inline_size"
+            f" THEN {column_name} END {LOB_LOCATOR}{i}"
+        )
+    if lob_positions:
+        binds['lob_inline_size'] = o2p.get_parameter(LOB_INLINE_SIZE)
+
+    query = f"SELECT {','.join(select)} FROM {table_name}{where}"
+    batch = _get_batch(o2p, table_name, insert_rows)
+    cursor = o2p.get_oracle_connection().cursor()
+    cursor.arraysize = batch['rows']
+    cursor.execute(query, binds)
+
+    plan = _get_plan(o2p, table_name, columns, cursor.description[:len(columns)], chunk)
+    plan['lobs'] = bool(lob_positions)
+    plan['batch'] = batch
+
+    batches = _fetch(cursor, batch)
+    if lob_positions:
+        batches = _merge_lobs(batches, lob_positions)
+
+    try:
+        _pipeline(
+            batches,
+            lambda rows: _encode(plan, rows),
+            lambda encoded: _write(o2p, plan, encoded),
+            o2p.get_parameter(PIPELINE_DEPTH)
         )
-        cmd = cmd.replace('\x00', '')
-        o2p.postgresql_cmd(cmd)
+    finally:
+        cursor.close()
 
 
 # -----------------------------------------------
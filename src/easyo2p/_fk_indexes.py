@@ -0,0 +1,78 @@
+"""
+
+easyo2p: _fk_indexes.py
+Extension of the _main.o2p class for finding, and creating, the indexes missing from foreign keys
+
+"""
+
+# -----------------------------------------------
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, List
+
+from easyo2p import CONSTRAINT, CREATE, FK_INDEXES, INDEX, TABLE
+import easyo2p._foreign_keys as o2p_foreign_keys
+import easyo2p._indexes as o2p_indexes
+if TYPE_CHECKING:
+    from easyo2p import O2P
+
+# -----------------------------------------------
+
+
+def _get_indexed_columns(o2p: O2P, table_name: str) -> List[List[str]]:
+    """
+    Gets the columns of the table's primary and unique keys and every index, in order.
+    Including unique and function based indexes, whose leading columns serve a foreign key.
+    """
+
+    indexed = {}
+
+    for name, object_type in [('keys', CONSTRAINT), ('index_columns', INDEX)]:
+        records, cols = o2p.catalog_query(name, table_name)
+        for record in records:
+            object_name = record[cols['constraint_name' if name == 'keys' else 'index_name']]
+            if not o2p.is_excluded(object_type, object_name):
+                indexed.setdefault((object_type, object_name), []).append(
+                    o2p.rename_column(table_name, record[cols['column_name']])
+                )
+
+    return list(indexed.values())
+
+
+# -----------------------------------------------
+
+
+def main(o2p: O2P, table_name: str):
+    """
+    Reports the foreign keys without an index whose leading columns are the foreign key columns,
+    as deletes and updates of the referenced rows scan the whole table.
+    And creates the indexes, when ``fk_indexes`` is CREATE.
+    """
+
+    indexed_columns = _get_indexed_columns(o2p, table_name)
+    pgs_table_name = o2p.rename_object(TABLE, table_name)
+    records, cols = o2p.catalog_query('tables', table_name)
+    source_tbs = records[0][cols['tablespace_name']] if records else ''
+
+    for constraint_data in o2p_foreign_keys.get_foreign_keys(o2p, table_name):
+        foreign_key_name = o2p.rename_object(CONSTRAINT, constraint_data['constraint_name'])
+        columns = constraint_data['columns']
+        if o2p.is_excluded(CONSTRAINT, foreign_key_name) or any(
+                set(i[:len(columns)]) == set(columns) for i in indexed_columns
+        ):
+            continue
+
+        if o2p.get_parameter(FK_INDEXES) == CREATE:
+            o2p_indexes.add_index(
+                o2p, table_name, f"{constraint_data['constraint_name']}_I", columns, source_tbs
+            )
+            indexed_columns.append(columns)
+        else:
+            o2p.log(
+                f"{pgs_table_name} Foreign key {foreign_key_name}"
+                f" ({','.join(columns)}) has no index"
+            )
+
+
+# -----------------------------------------------
+# End.
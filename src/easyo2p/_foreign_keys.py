@@ -8,9 +8,10 @@ Extension of the _main.o2p class for adding foreign key constraints
 # -----------------------------------------------
 
 from __future__ import annotations
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict, List
+import time
 
-from easyo2p import CONSTRAINT, TABLE, TABLES
+from easyo2p import CONSTRAINT, DEFER_FK_VALIDATION, ETL_MIGRATE, TABLE, TABLES
 if TYPE_CHECKING:
     from easyo2p import O2P
 
@@ -20,9 +21,6 @@ if TYPE_CHECKING:
 def _add_fk_constraint(o2p: O2P, table_name: str, constraint_data: Dict):
     """ Adds a foreign key constraint """
 
-    if not constraint_data:
-        return
-
     foreign_key_name = o2p.rename_object(CONSTRAINT, constraint_data['constraint_name'])
     if o2p.is_excluded(CONSTRAINT, foreign_key_name):
         return
@@ -33,54 +31,66 @@ def _add_fk_constraint(o2p: O2P, table_name: str, constraint_data: Dict):
     columns = ','.join(constraint_data['columns'])
     r_columns = ','.join(constraint_data['r_columns'])
 
+    # Not valid foreign keys are only checked for new rows, until validated
+    not_valid = ' NOT VALID' if o2p.get_parameter(DEFER_FK_VALIDATION) else ''
+
     o2p.postgresql_cmd((
         f"ALTER TABLE %%schema%%.{pgs_table_name} ADD CONSTRAINT {foreign_key_name} FOREIGN KEY "
         f"({columns}) REFERENCES %%schema%%.{pgs_r_table_name} "
         f"({r_columns}) "
-        f"ON DELETE {constraint_data['delete_rule']};"
+        f"ON DELETE {constraint_data['delete_rule']}{not_valid};"
     ))
 
 
+# ---
+
+
+def _validate_fk_constraint(o2p: O2P, table_name: str, constraint_data: Dict):
+    """ Validates a foreign key constraint, created not valid """
+
+    foreign_key_name = o2p.rename_object(CONSTRAINT, constraint_data['constraint_name'])
+    if o2p.is_excluded(CONSTRAINT, foreign_key_name):
+        return
+
+    pgs_table_name = o2p.rename_object(TABLE, table_name)
+
+    start = time.perf_counter()
+    o2p.postgresql_cmd(
+        f"ALTER TABLE %%schema%%.{pgs_table_name} VALIDATE CONSTRAINT {foreign_key_name};"
+    )
+    if o2p.get_parameter(ETL_MIGRATE):
+        o2p.log(f'{foreign_key_name} Validated, {time.perf_counter() - start:.1f}s')
+
+
 # -----------------------------------------------
 
 
-def main(o2p: O2P, table_name: str):
-    """ Builds the primary and unique key constraint statements """
+def get_foreign_keys(o2p: O2P, table_name: str) -> List[Dict]:
+    """
+    Gets the table's foreign keys referencing the migrated tables
+
+    :return: list of the foreign keys, with their columns and referenced table and columns
+    """
 
     tables = o2p.get_parameter(TABLES)
-    constraint_name = ''
-    constraint_data = {}
-
-    query = (
-        'SELECT uc.constraint_name, ruc.table_name r_table_name,'
-        '       ucc.column_name, rucc.column_name r_column_name, uc.delete_rule'
-        '  FROM user_constraints uc,'
-        '       user_cons_columns ucc,'
-        '       user_constraints ruc,'
-        '       user_cons_columns rucc'
-        ' WHERE uc.constraint_name = ucc.constraint_name'
-        '   AND uc.r_constraint_name = ruc.constraint_name'
-        '   AND ruc.constraint_name = rucc.constraint_name'
-        '   AND ucc.position = rucc.position'
-        f"  AND uc.table_name = '{table_name}'"
-        ' ORDER BY uc.constraint_name, ucc.position'
-    )
+    foreign_keys = []
 
-    records, cols = o2p.oracle_query(query, True)
+    records, cols = o2p.catalog_query('foreign_keys', table_name)
 
     for record in records:
         if record[cols['r_table_name']] in tables:
-            if constraint_name != record[cols['constraint_name']]:
-                _add_fk_constraint(o2p, table_name, constraint_data)
-                constraint_name = record[cols['constraint_name']]
-                constraint_data = {
-                    'constraint_name': constraint_name,
+            if not foreign_keys or (
+                    foreign_keys[-1]['constraint_name'] != record[cols['constraint_name']]
+            ):
+                foreign_keys.append({
+                    'constraint_name': record[cols['constraint_name']],
                     'columns': [],
                     'r_table_name': o2p.rename_object('TABLE', record[cols['r_table_name']]),
                     'r_columns': [],
                     'delete_rule': record[cols['delete_rule']]
-                }
+                })
 
+            constraint_data = foreign_keys[-1]
             constraint_data['columns'].append(o2p.rename_column(
                 table_name, record[cols['column_name']]
             ))
@@ -89,7 +99,27 @@ def main(o2p: O2P, table_name: str):
                 constraint_data['r_table_name'], record[cols['r_column_name']]
             ))
 
-    _add_fk_constraint(o2p, table_name, constraint_data)
+    return foreign_keys
+
+
+# -----------------------------------------------
+
+
+def main(o2p: O2P, table_name: str):
+    """ Builds the foreign key constraint statements """
+
+    for constraint_data in get_foreign_keys(o2p, table_name):
+        _add_fk_constraint(o2p, table_name, constraint_data)
+
+
+# ---
+
+
+def validate(o2p: O2P, table_name: str):
+    """ Builds the statements validating the foreign keys, created not valid """
+
+    for constraint_data in get_foreign_keys(o2p, table_name):
+        _validate_fk_constraint(o2p, table_name, constraint_data)
 
 
 # -----------------------------------------------
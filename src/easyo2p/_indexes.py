@@ -17,7 +17,7 @@ if TYPE_CHECKING:
 # -----------------------------------------------
 
 
-def _add_index(o2p: O2P, table_name: str, index_name: str, cols: List, tbs: str):
+def add_index(o2p: O2P, table_name: str, index_name: str, cols: List, tbs: str):
     """ Executes the create index statement """
 
     if index_name and not o2p.is_excluded(INDEX, index_name):
@@ -37,30 +37,20 @@ def _add_index(o2p: O2P, table_name: str, index_name: str, cols: List, tbs: str)
 def main(o2p, table_name: str):
     """ Builds the indexes """
 
-    query = (
-        "SELECT ui.index_name, uic.column_name, ui.tablespace_name"
-        "  FROM user_indexes ui, user_ind_columns uic"
-        " WHERE ui.uniqueness = 'NONUNIQUE'"
-        "   AND ui.index_type = 'NORMAL'"
-        f"  AND ui.table_name = '{table_name}'"
-        "   AND ui.index_name = uic.index_name"       
-        " ORDER BY ui.index_name, uic.column_position"
-    )
-
-    records, cols = o2p.oracle_query(query, True)
+    records, cols = o2p.catalog_query('indexes', table_name)
 
     columns = []
     index_name = source_tbs = ''
 
     for record in records:
         if index_name != record[cols['index_name']]:
-            _add_index(o2p, table_name, index_name, columns, source_tbs)
+            add_index(o2p, table_name, index_name, columns, source_tbs)
             index_name = record[cols['index_name']]
             source_tbs = record[cols['tablespace_name']]
             columns = []
         columns.append(record[cols['column_name']])
 
-    _add_index(o2p, table_name, index_name, columns, source_tbs)
+    add_index(o2p, table_name, index_name, columns, source_tbs)
 
 
 # -----------------------------------------------
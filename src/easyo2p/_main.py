@@ -10,25 +10,72 @@ The O2P class that manages the Oracle to PostgreSQL migration.
 # pylint: disable=c-extension-no-member
 # -----------------------------------------------
 
-from typing import Any, Dict, List, Tuple, Union
+from typing import IO, Any, Callable, Dict, Iterator, List, Tuple, Union
 
+import concurrent.futures
+import contextlib
+import copy
 import datetime
+import gzip
+import io
+import json
 import logging
 import os
+import queue
+import re
+import shutil
+import threading
+import time
 
 import cx_Oracle
 import psycopg2
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 from easyo2p._constants import *    # pylint: disable=unused-wildcard-import,wildcard-import
+import easyo2p._catalog as o2p_catalog
 import easyo2p._data as o2p_data
+import easyo2p._fk_indexes as o2p_fk_indexes
 import easyo2p._foreign_keys as o2p_foreign_keys
 import easyo2p._indexes as o2p_indexes
+import easyo2p._refresh as o2p_refresh
+import easyo2p._replay as o2p_replay
 import easyo2p._sequences as o2p_sequences
 import easyo2p._tables as o2p_tables
 import easyo2p._triggers as o2p_triggers
 
 # -----------------------------------------------
 
+# Compressed ETL file extensions, and the commands which decompress them for the run script
+_COMPRESSION_EXTENSIONS = {GZIP: '.gz', ZSTD: '.zst'}
+_COMPRESSION_COMMANDS = {'.gz': 'gzip -dc', '.zst': 'zstd -dc'}
+_COMPRESSION_SUFFIXES = ['', '.gz', '.zst']
+_GZIP_LEVEL = 6
+
+# PostgreSQL memory settings, in kB unless a unit is given
+_MEMORY = re.compile(r'(?P<size>\d+)\s*(?P<unit>kB|MB|GB|TB)?', re.IGNORECASE)
+_MEMORY_UNITS = {None: 1, 'KB': 1, 'MB': 1024, 'GB': 1024 ** 2, 'TB': 1024 ** 3}
+
+# Parallel index builds, as PostgreSQL plans them. A worker once the table reaches
+# min_parallel_table_scan_size, another each time it triples, and 32MB for each participant
+_PARALLEL_TABLE_SIZE = 8 * 1024 ** 2
+_PARALLEL_WORK_MEM = 32 * 1024
+
+# Journal entry of a table's chunk boundaries, reused when resuming after committed chunks
+_CHUNKS = 'CHUNKS'
+
+# Journal steps of a table's deferred keys and foreign key validation, around its constraints
+_KEYS = 'KEYS'
+_VALIDATE = 'VALIDATE'
+
+# Journal steps of a table set logged after a bulk load, and its post-load maintenance
+_LOGGED = 'LOGGED'
+_MAINTENANCE = 'MAINTENANCE'
+
+# -----------------------------------------------
+
 
 class O2P:
     """ Oracle to PostgreSQL migration tools class"""
@@ -40,12 +87,20 @@ class O2P:
         Initialise the o2p class
         """
 
+        self._catalog = {}
+        self._catalog_lock = threading.Lock()
         self._conn_ora = None
         self._conn_pgs = []
         self._etl_file = None
         self._stage = PRE
         self._file_number = 0
+        self._index_lock = threading.Lock()
+        self._journal = set()
+        self._journal_chunks = {}
+        self._journal_lock = threading.Lock()
         self._parameters = _get_parameters(**kwargs)
+        self._segment = None
+        self._skip_output = False
         self._validate_target_path()
 
         if self._parameters['_target_path_validated']:
@@ -57,6 +112,54 @@ class O2P:
         else:
             self._logger = None
 
+        self._journal_load()
+
+    # -------------------------------------------
+
+    def catalog_iter(self, name: str, object_name: str) -> Tuple[Iterator, Dict]:
+        """
+        Gets an object's records from an Oracle dictionary query, as ``catalog_query``.
+        Unless the catalog already holds them, the records of the larger views are streamed
+        for the object alone, see ``easyo2p._catalog.OBJECT_QUERIES``.
+
+        :param name: the name of the catalog query
+        :param object_name: the name of the object
+        :return: tuple of an iterator of the records, and the column positions
+        """
+
+        with self._catalog_lock:
+            held = name in self._catalog or self._parameters[SNAPSHOT_LOAD]
+
+        if held or name not in o2p_catalog.OBJECT_QUERIES:
+            records, cols = self.catalog_query(name, object_name)
+            return iter(records), cols
+
+        return self.oracle_iter(o2p_catalog.OBJECT_QUERIES[name], {'name': object_name})
+
+    # ---
+
+    def catalog_query(self, name: str, object_name: str = None) -> Tuple[List, Dict]:
+        """
+        Gets an object's records from an Oracle dictionary query.
+        The query is run once for the whole schema, when first used, then held in memory.
+        When a snapshot is loaded, the records come from the snapshot instead.
+
+        :param name: the name of the catalog query, see ``easyo2p._catalog.QUERIES``
+        :param object_name: the name of the object, typically the table name, or None for all
+        :return: tuple of the records and the column positions, as ``oracle_query``
+        """
+
+        with self._catalog_lock:
+            if name not in self._catalog:
+                if self._parameters[SNAPSHOT_LOAD]:
+                    raise ValueError(f'"{name}" not found in snapshot')
+                self._catalog[name] = o2p_catalog.fetch(self, name)
+
+        records, cols = self._catalog[name]
+        if object_name is None:
+            return [i for j in records.values() for i in j], cols
+        return records.get(object_name, []), cols
+
     # -------------------------------------------
 
     def create_run_script(self):
@@ -72,7 +175,7 @@ class O2P:
             run_file_name = file_name.replace('\\', '/')
 
             script = [f"-- \\i '{run_file_name}' \n"]
-            if self._parameters[DROP_SCHEMA]:
+            if self._parameters[DROP_SCHEMA] and not self._parameters[REFRESH]:
                 script.append(f"DROP SCHEMA IF EXISTS {schema} CASCADE; \n")
 
             client_encoding = (
@@ -87,17 +190,58 @@ class O2P:
                 '\\set AUTOCOMMIT on \n',
             ])
 
+            if self._parameters[BULK_LOAD]:
+                script.extend([f'{i} \n' for i in self._bulk_load_settings()])
+
             files = sorted(os.listdir(self._parameters[TARGET_PATH]))
 
-            for file_type in ['.1.sql', '.2.sql', '.3.sql', '.4.sql', '.5.sql', '.6.sql']:
+            # Compressed files are decompressed into a psql session, with the same settings
+            if any(i.endswith(tuple(_COMPRESSION_COMMANDS)) for i in files):
+                options = [f'-c search_path={schema}']
+                if self._parameters[BULK_LOAD]:
+                    options.extend([
+                        '-c synchronous_commit=off',
+                        f'-c maintenance_work_mem={self._parameters[BULK_LOAD_WORK_MEM]}'
+                    ])
+                script.extend([
+                    f"\\setenv PGOPTIONS '{' '.join(options)}'",
+                    f"\\setenv PGCLIENTENCODING {client_encoding}",
+                    '\\setenv PGHOST :HOST',
+                    '\\setenv PGPORT :PORT',
+                    '\\setenv PGDATABASE :DBNAME',
+                    '\\setenv PGUSER :USER',
+                    # The exit status of a shell command is only seen from psql 16
+                    'SELECT :VERSION_NUM >= 160000 AS o2p_shell_error \\gset',
+                    '\\if :o2p_shell_error',
+                    '\\else',
+                    '\\echo psql 16 or later is required to stop when a compressed file fails',
+                    '\\set SHELL_ERROR false',
+                    '\\endif'
+                ])
+
+            target_path = os.path.dirname(run_file_name)
+            for file_type in [
+                    '.1.sql', '.2.sql', '.3.sql', '.4.sql', '.5.sql', '.6.sql', '.7.sql'
+            ]:
                 script.append(f'\n\\echo Processing "{file_type}" files...\n')
-                for file in files:
+                for file in sorted(files, key=o2p_replay.step_order):
                     if file.endswith(file_type):
                         script.append(f'\\ir {file}')
+                    for extension, command in _COMPRESSION_COMMANDS.items():
+                        if file.endswith(file_type + extension):
+                            script.extend([
+                                f"\\! {command} '{target_path}/{file}'"
+                                " | psql -X -q -v ON_ERROR_STOP=1",
+                                '\\if :SHELL_ERROR',
+                                f'\\echo Failed: {file}',
+                                '\\quit',
+                                '\\endif'
+                            ])
 
             script.append('\n')
 
             self.file_write_from_string(file_name, '\n'.join(script))
+            self._write_manifest(files)
             self.log(f"Run: \\i '{run_file_name}'")
 
     # -------------------------------------------
@@ -106,12 +250,18 @@ class O2P:
         """ Run the etl process, ensure parameters are all set. """
 
         self._stage = ETL
+
+        if self._parameters[SNAPSHOT_LOAD]:
+            self._catalog = o2p_catalog.load_snapshot(self._parameters[SNAPSHOT_LOAD])
+            self.log(f'Catalog snapshot loaded: {self._parameters[SNAPSHOT_LOAD]}')
+
         self._initialise_parameters()
 
         # ---
         #  Connections
 
-        self.get_oracle_connection()
+        if not self._parameters[SNAPSHOT_LOAD]:
+            self.get_oracle_connection()
 
         if self._parameters[ETL_MIGRATE]:
             self.get_postgres_connection()
@@ -119,43 +269,75 @@ class O2P:
         # ---
         #   ETL 1/3: Sequences
 
-        if self._parameters['_sequences']:
-            self._etl_set_file('sequences.2.sql', 'Creating Sequences')
-            o2p_sequences.main(self)
-            self._etl_close_file()
+        if (
+                self._parameters['_sequences'] and not self._parameters[REFRESH]
+                and not self._journal_done(SEQUENCE)
+        ):
+            self._etl_remove_file('sequences.2.sql')
+            with self._transaction('Sequences'):
+                self._etl_set_file('sequences.2.sql', 'Creating Sequences')
+                o2p_sequences.main(self)
+                self._etl_close_file()
+            self._journal_write(SEQUENCE)
 
         # ---
         #   ETL 2/3: Tables and Data
 
-        table_columns = {}
-
-        for table_name in self._parameters[TABLES]:
-            pgs_table_name = self.rename_object(TABLE, table_name)
-            columns = table_columns[table_name] = []
-            self._etl_set_file(f'{pgs_table_name}.3.sql', f'{pgs_table_name} Table')
-            o2p_tables.main(self, table_name, columns)
-            if self._parameters[ETL_DATA]:
-                self._etl_set_file(f'{pgs_table_name}.4.sql', f'{pgs_table_name} Data')
-                o2p_data.main(self, table_name, columns, self._parameters[INSERT_ROWS])
+        self._parallel(O2P._etl_table, self._parameters[TABLES], self._parameters[JOBS])
 
         # ---
-        #   ETL 3/3: Foreign Keys, Indexes, and Triggers
+        #   ETL 3/3: Keys, Foreign Keys, Indexes, and Triggers
 
-        for table_name in self._parameters[TABLES]:
-            pgs_table_name = self.rename_object(TABLE, table_name)
-            etl_file = f'{pgs_table_name}.5.sql'
-            if self._parameters[ETL_CONSTRAINTS]:
-                self._etl_set_file(etl_file, f'{pgs_table_name} Foreign Keys')
-                o2p_foreign_keys.main(self, table_name)
-                self._etl_set_file(etl_file, f'{pgs_table_name} Indexes')
-                o2p_indexes.main(self, table_name)
-            if self._parameters[ETL_TRIGGERS]:
-                self._etl_set_file(etl_file, f'{pgs_table_name} Triggers')
-                o2p_triggers.main(self, table_name)
+        # The biggest tables are started first, so they are not left running on their own
+        tables = sorted(self._parameters[TABLES], key=self._table_size, reverse=True)
+
+        # Tables are set logged before any constraints, as logged tables may only reference
+        # logged tables
+        if self._parameters[BULK_LOAD] and self._parameters[ETL_DATA]:
+            self._parallel(O2P._etl_logged, tables, self._parameters[INDEX_JOBS])
+
+        # All the keys are created first, as foreign keys need the keys they reference
+        if self._parameters[DEFER_KEYS] and self._parameters[ETL_CONSTRAINTS]:
+            self._index_builds(tables)
+            self._parallel(O2P._etl_keys, tables, self._parameters[INDEX_JOBS])
+
+        self._index_builds(tables)
+        self._parallel(
+            O2P._etl_constraints, tables, self._parameters[INDEX_JOBS], self._constraint_locks()
+        )
+
+        # Foreign keys created not valid are validated once all the constraints are created
+        if self._parameters[DEFER_FK_VALIDATION] and self._parameters[ETL_CONSTRAINTS]:
+            self._parallel(
+                O2P._etl_validate,
+                [i for i in tables if o2p_foreign_keys.get_foreign_keys(self, i)],
+                self._parameters[INDEX_JOBS]
+            )
 
         # ---
 
         self._etl_close_file()
+        self.postgresql_commit()
+
+        if self._parameters[REFRESH_STATE]:
+            o2p_refresh.save_state(
+                self._parameters[REFRESH_STATE],
+                {**self._parameters['_refresh_state'], **self._parameters['_refresh_marks']}
+            )
+
+        # ---
+        #   Maintenance, once the data is committed, as VACUUM runs outside of a transaction
+
+        if self._parameters[MAINTENANCE]:
+            self._parallel(
+                O2P._etl_maintenance,
+                tables,
+                self._parameters[MAINTENANCE_JOBS] or self._parameters[INDEX_JOBS]
+            )
+
+        if self._parameters[SNAPSHOT_SAVE]:
+            self._save_snapshot()
+
         self._stage = POST
 
     # -------------------------------------------
@@ -280,9 +462,15 @@ class O2P:
                 else self._parameters[ENCODING]
             )
 
-            cx_Oracle.init_oracle_client(lib_dir=self._parameters[ORACLE_INSTANT_CLIENT])
-            self._conn_ora = cx_Oracle.connect(self._parameters[ORACLE_CONN], encoding=encoding)
+            try:
+                cx_Oracle.init_oracle_client(lib_dir=self._parameters[ORACLE_INSTANT_CLIENT])
+            except cx_Oracle.ProgrammingError:
+                pass  # Already initialised, by another session
+            self._conn_ora = cx_Oracle.connect(
+                self._parameters[ORACLE_CONN], encoding=encoding, threaded=True
+            )
             self._conn_ora.outputtypehandler = _output_type_handler
+            self._conn_ora.stmtcachesize = self._parameters[ORACLE_STMT_CACHE_SIZE]
 
         return self._conn_ora
 
@@ -309,18 +497,49 @@ class O2P:
 
     # -------------------------------------------
 
-    def oracle_query(self, query: str, inc_cols: bool = False) -> Union[Tuple[List, List], List]:
+    def oracle_iter(self, query: str, binds: Dict = None) -> Tuple[Iterator, Dict]:
         """
-        Executes a query on the Oracle database
+        Executes a query on the Oracle database, streaming the records rather than fetching all.
+        Records are fetched in batches of ``oracle_arraysize``, so memory use is bounded.
+
+        :param query: the query string
+        :param binds: the bind variable values, by name
+        :return: tuple of a generator of the records, and the column positions
+        """
+
+        cursor = self.get_oracle_connection().cursor()
+        cursor.arraysize = self._parameters[ORACLE_ARRAYSIZE]
+        cursor.prefetchrows = self._parameters[ORACLE_PREFETCH_ROWS]
+        cursor.execute(query, binds or {})
+        columns = {c[0].lower(): i for i, c in enumerate(cursor.description)}
+
+        def records():
+            try:
+                while batch := cursor.fetchmany():
+                    yield from batch
+            finally:
+                cursor.close()
+
+        return records(), columns
+
+    # -------------------------------------------
+
+    def oracle_query(
+            self, query: str, inc_cols: bool = False, binds: Dict = None
+    ) -> Union[Tuple[List, List], List]:
+        """
+        Executes a query on the Oracle database.
+        Values should be passed as binds, so the statement is parsed once and cached.
 
         :param query: the query string
         :param inc_cols: should a tuple be returned which also includes the columns and positions
+        :param binds: the bind variable values, by name
         :return: data or tuple of data and column names
         """
 
         conn = self.get_oracle_connection()
         cursor = conn.cursor()
-        cursor.execute(query)
+        cursor.execute(query, binds or {})
         columns = {c[0].lower(): i for i, c in enumerate(cursor.description)} if inc_cols else None
         data = list(cursor.fetchall())
         cursor.close()
@@ -329,27 +548,91 @@ class O2P:
 
     # -------------------------------------------
 
-    def postgresql_cmd(self, cmd: str, filename: str = ''):
+    def postgresql_cmd(self, cmd: str, filename: str = '', migrate: bool = True):
         """
         Executes a PostgreSQL DDL or DML command. Either to a file, postgresql database, or both.
 
         :param cmd: the command string.
         :param filename: the ETL filename to write the command to.
+        :param migrate: execute the command on PostgreSQL, when migrating. False writes file only.
         """
 
+        if self._skip_output:
+            return
+
         cmd = cmd.replace('%%schema%%', self._parameters[POSTGRES_SCHEMA])
 
+        # Commands before and after the ETL each have their own numbered file and journal step
+        if self._stage != ETL:
+            self._file_number += 1
+            if self._journal_done(self._stage, self._file_number):
+                return
+
         if self._stage != ETL and self._parameters[ETL_FILES]:
             filename = filename or 'postgresql_cmd'
             self._etl_set_file(filename, f'PostgreSQL Cmd: {os.path.basename(filename)}')
 
         self._etl_write(cmd + '\n')
 
-        if self._parameters[ETL_MIGRATE]:
+        if migrate and self._parameters[ETL_MIGRATE]:
             if not self._conn_pgs:
                 self.postgresql_init_schema()
             for conn in self._conn_pgs:
                 conn.cursor().execute(cmd)
+            if self._stage != ETL:
+                self.postgresql_commit()
+
+        if self._stage != ETL:
+            self._etl_close_file()
+            self._journal_write(self._stage, self._file_number)
+
+    # -----------------------------------------------
+
+    def postgresql_commit(self):
+        """ Commits the PostgreSQL transactions, unless the ``transactions`` mode is autocommit """
+
+        if self._parameters[TRANSACTIONS] != AUTOCOMMIT:
+            for conn in self._conn_pgs:
+                conn.commit()
+
+    # ---
+
+    def postgresql_rollback(self):
+        """ Rolls back the PostgreSQL transactions, unless the mode is autocommit """
+
+        if self._parameters[TRANSACTIONS] != AUTOCOMMIT:
+            for conn in self._conn_pgs:
+                conn.rollback()
+
+    # -----------------------------------------------
+
+    def postgresql_copy(self, cmd: str, data: IO, migrate: bool = True, etl_file: bool = False):
+        """
+        Streams data to PostgreSQL using a ``COPY ... FROM STDIN`` command.
+        And or writes it to the ETL file, as a copy block ended by ``\\.``, for psql to replay.
+
+        :param cmd: the copy command string.
+        :param data: file like object containing the data, read once for each connection.
+        :param migrate: copy the data to PostgreSQL, when migrating.
+        :param etl_file: write the command and data to the ETL file, the data must be text.
+        """
+
+        cmd = cmd.replace('%%schema%%', self._parameters[POSTGRES_SCHEMA])
+
+        if etl_file and self._etl_file:
+            self._etl_write(cmd + '\n')
+            data.seek(0)
+            shutil.copyfileobj(data, self._etl_file[1])
+            self._etl_write('\\.\n')
+
+        if not (migrate and self._parameters[ETL_MIGRATE]):
+            return
+
+        if not self._conn_pgs:
+            self.postgresql_init_schema()
+        for conn in self._conn_pgs:
+            data.seek(0)
+            conn.cursor().copy_expert(cmd, data)
 
     # -----------------------------------------------
 
@@ -381,11 +664,14 @@ class O2P:
 
             self._conn_pgs = []
             for conn_string in self._parameters[POSTGRES_CONN]:
-                conn = psycopg2.connect(conn_string)
-                conn.set_session(autocommit=True)
-                if self._parameters[DROP_SCHEMA]:
+                conn = self._postgresql_connect(conn_string)
+                if self._parameters[DROP_SCHEMA] and not (
+                        self._parameters[RESUME] or self._parameters[REFRESH]
+                ):
                     conn.cursor().execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
                 conn.cursor().execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+                if self._parameters[TRANSACTIONS] != AUTOCOMMIT:
+                    conn.commit()
                 self._conn_pgs.append(conn)
 
     # -------------------------------------------
@@ -439,9 +725,292 @@ class O2P:
 
     # -------------------------------------------
 
+    @contextlib.contextmanager
+    def _autocommit(self):
+        """ Runs the statements within the context outside of a transaction, as VACUUM requires """
+
+        self.postgresql_commit()
+        for conn in self._conn_pgs:
+            conn.set_session(autocommit=True)
+        try:
+            yield
+        finally:
+            for conn in self._conn_pgs:
+                conn.set_session(autocommit=self._parameters[TRANSACTIONS] == AUTOCOMMIT)
+
+    # -------------------------------------------
+
+    def _bulk_load_settings(self) -> List[str]:
+        """ Session settings for bulk loading, avoiding waits for WAL flushes """
+
+        return [
+            "SET synchronous_commit = off;",
+            f"SET maintenance_work_mem = '{self._parameters[BULK_LOAD_WORK_MEM]}';"
+        ]
+
+    # -------------------------------------------
+
+    def _close(self):
+        """ Closes the ETL file and database connections """
+
+        self._etl_close_file()
+        for conn in self._conn_pgs:
+            conn.close()
+        self._conn_pgs = []
+        if self._conn_ora:
+            self._conn_ora.close()
+            self._conn_ora = None
+
+    # -------------------------------------------
+
+    def _constraint_locks(self) -> Dict[str, set]:
+        """ The tables locked by each table's constraints, itself and the tables it references """
+
+        locks = {i: {i} for i in self._parameters[TABLES]}
+        if self._parameters[ETL_CONSTRAINTS]:
+            records, cols = self.catalog_query('foreign_keys')
+            for record in records:
+                if record[cols['table_name']] in locks and record[cols['r_table_name']] in locks:
+                    locks[record[cols['table_name']]].add(record[cols['r_table_name']])
+
+        return locks
+
+    # -------------------------------------------
+
+    def _etl_table(self, table_name: str):
+        """ Creates the table and migrates its data """
+
+        if self._journal_done(TABLE, table_name):
+            return
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        columns = []
+        resume_chunks = self._resume_table(table_name)
+
+        with self._transaction(f'{pgs_table_name} Table'):
+            if resume_chunks or self._parameters[REFRESH]:
+                with self._skipped_output():
+                    o2p_tables.main(self, table_name, columns)
+            else:
+                self._etl_set_file(f'{pgs_table_name}.3.sql', f'{pgs_table_name} Table')
+                o2p_tables.main(self, table_name, columns)
+                self._etl_close_file()
+
+            if self._parameters[ETL_DATA] and self._parameters[REFRESH] and (
+                    not o2p_refresh.get_conflict(self, table_name, columns)
+            ):
+                self.log(f'{pgs_table_name} Not refreshed, no primary or unique key')
+            elif self._parameters[ETL_DATA]:
+                if self._parameters[REFRESH_STATE]:
+                    self._parameters['_refresh_marks'][table_name] = (
+                        o2p_refresh.get_mark(self, table_name)
+                    )
+                chunks = self._get_chunks(table_name, resume_chunks)
+                chunk_jobs = self._parameters[CHUNK_JOBS]
+                if len(chunks) > 1 and chunk_jobs > 1:
+                    self.postgresql_commit()   # Chunks are loaded by other sessions
+                chunks = [
+                    i for i in chunks if not self._journal_done(TABLE, table_name, i.get('chunk'))
+                ]
+                self._parallel(
+                    lambda o2p, chunk: o2p._etl_data(table_name, columns, chunk),
+                    chunks,
+                    chunk_jobs
+                )
+
+        self._journal_write(TABLE, table_name)
+
+    # ---
+
+    def _etl_logged(self, table_name: str):
+        """ Sets the table logged, once its data is bulk loaded """
+
+        if self._parameters[REFRESH] or self._journal_done(TABLE, table_name, _LOGGED):
+            return
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        etl_file = f'{pgs_table_name}.logged.5.sql'
+        self._etl_remove_file(etl_file)
+        with self._transaction(f'{pgs_table_name} Logged'):
+            self._etl_set_file(etl_file, f'{pgs_table_name} Logged')
+            self.postgresql_cmd(f"ALTER TABLE %%schema%%.{pgs_table_name} SET LOGGED;")
+            self._etl_close_file()
+        self._journal_write(TABLE, table_name, _LOGGED)
+
+    # ---
+
+    def _etl_keys(self, table_name: str):
+        """ Creates the table's primary and unique keys, once its data is loaded """
+
+        if self._parameters[REFRESH] or self._journal_done(CONSTRAINT, table_name, _KEYS):
+            return
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        etl_file = f'{pgs_table_name}.keys.5.sql'
+        self._etl_remove_file(etl_file)
+        with self._transaction(f'{pgs_table_name} Keys'), self._index_build(table_name):
+            self._etl_set_file(etl_file, f'{pgs_table_name} Keys')
+            o2p_tables.keys(self, table_name)
+            self._etl_close_file()
+        self._journal_write(CONSTRAINT, table_name, _KEYS)
+
+    # ---
+
+    def _etl_constraints(self, table_name: str):
+        """ Creates the table's foreign keys, indexes and triggers, once its data is loaded """
+
+        if self._parameters[REFRESH] or self._journal_done(CONSTRAINT, table_name):
+            return
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        etl_file = f'{pgs_table_name}.5.sql'
+        self._etl_remove_file(etl_file)
+        with self._transaction(f'{pgs_table_name} Constraints'), self._index_build(table_name):
+            if self._parameters[ETL_CONSTRAINTS]:
+                self._etl_set_file(etl_file, f'{pgs_table_name} Foreign Keys')
+                o2p_foreign_keys.main(self, table_name)
+                self._etl_set_file(etl_file, f'{pgs_table_name} Indexes')
+                o2p_indexes.main(self, table_name)
+                if self._parameters[FK_INDEXES] == CREATE:
+                    self._etl_set_file(etl_file, f'{pgs_table_name} Foreign Key Indexes')
+                if self._parameters[FK_INDEXES]:
+                    o2p_fk_indexes.main(self, table_name)
+            if self._parameters[ETL_TRIGGERS]:
+                self._etl_set_file(etl_file, f'{pgs_table_name} Triggers')
+                o2p_triggers.main(self, table_name)
+            self._etl_close_file()
+        self._journal_write(CONSTRAINT, table_name)
+
+    # ---
+
+    def _etl_validate(self, table_name: str):
+        """ Validates the table's foreign keys, created not valid """
+
+        if self._parameters[REFRESH] or self._journal_done(CONSTRAINT, table_name, _VALIDATE):
+            return
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        etl_file = f'{pgs_table_name}.validate.5.sql'
+        self._etl_remove_file(etl_file)
+        with self._transaction(f'{pgs_table_name} Validate'):
+            self._etl_set_file(etl_file, f'{pgs_table_name} Validate Foreign Keys')
+            o2p_foreign_keys.validate(self, table_name)
+            self._etl_close_file()
+        self._journal_write(CONSTRAINT, table_name, _VALIDATE)
+
+    # ---
+
+    def _etl_maintenance(self, table_name: str):
+        """ Vacuums or analyzes the table, so its first queries have statistics to plan with """
+
+        if self._journal_done(TABLE, table_name, _MAINTENANCE):
+            return
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        etl_file = f'{pgs_table_name}.7.sql'
+        self._etl_remove_file(etl_file)
+        with self._autocommit():
+            self._etl_set_file(etl_file, f'{pgs_table_name} Maintenance')
+            start = time.perf_counter()
+            self.postgresql_cmd(
+                f"VACUUM (ANALYZE) %%schema%%.{pgs_table_name};"
+                if self._parameters[MAINTENANCE] == VACUUM else
+                f"ANALYZE %%schema%%.{pgs_table_name};"
+            )
+            if self._parameters[ETL_MIGRATE]:
+                self.log(f'{pgs_table_name} Maintenance, {time.perf_counter() - start:.1f}s')
+            self._etl_close_file()
+        self._journal_write(TABLE, table_name, _MAINTENANCE)
+
+    # ---
+
+    def _etl_data(self, table_name: str, columns: List, chunk: Dict):
+        """ Migrates the table data, or a chunk of it to its own file """
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        if chunk:
+            number = str(chunk['chunk']).zfill(4)
+            stem, msg = f'{pgs_table_name}.{number}', f'{pgs_table_name} Data, Chunk {number}'
+            self._etl_remove_file(f'{stem}.4.sql')
+        else:
+            stem, msg = pgs_table_name, f'{pgs_table_name} Data'
+
+        if self._parameters[FILE_SEGMENT_ROWS] or self._parameters[FILE_SEGMENT_BYTES]:
+            self._segment = {'stem': stem, 'msg': msg, 'number': 1, 'rows': 0, 'bytes': 0}
+            self._etl_set_file(f'{stem}.s0001.4.sql', f'{msg}, Segment 0001')
+        else:
+            self._etl_set_file(f'{stem}.4.sql', msg)
+
+        with self._transaction(f'{pgs_table_name} Data'):
+            o2p_data.main(self, table_name, columns, self._parameters[INSERT_ROWS], chunk)
+        self._etl_close_file()
+        self._segment = None
+
+        # Chunks are resumed individually when each is committed in its own transaction
+        if chunk and (
+                not self._parameters[ETL_MIGRATE] or self._parameters[TRANSACTIONS] == TABLE
+        ):
+            self._journal_write(TABLE, table_name, chunk['chunk'])
+
+    # -------------------------------------------
+
+    def _etl_compressed_name(self, filename: str) -> str:
+        """ Adds the compression extension to the filename, when the file is compressed """
+
+        compression = self._parameters[FILE_COMPRESSION]
+        if compression and (filename.endswith('.4.sql') or self._parameters[FILE_COMPRESSION_DDL]):
+            return filename + _COMPRESSION_EXTENSIONS[compression]
+        return filename
+
+    # ---
+
+    def _etl_open_file(self, filepath: str) -> IO:
+        """ Opens an ETL file for appending, through the compressor for its extension """
+
+        encoding = self._parameters[ENCODING]
+        if filepath.endswith(tuple(_COMPRESSION_COMMANDS)):
+            # Appending adds a gzip member or zstd frame, so a BOM would land mid stream
+            encoding = 'utf-8' if encoding.lower().replace('_', '-') == 'utf-8-sig' else encoding
+
+        # pylint: disable=consider-using-with        # Need to keep file open after method
+        if filepath.endswith(_COMPRESSION_EXTENSIONS[GZIP]):
+            return gzip.open(filepath, 'at', compresslevel=_GZIP_LEVEL, encoding=encoding)
+        if filepath.endswith(_COMPRESSION_EXTENSIONS[ZSTD]):
+            writer = zstandard.ZstdCompressor().stream_writer(open(filepath, 'ab'))
+            return io.TextIOWrapper(writer, encoding=encoding)
+        return open(filepath, 'a', encoding=encoding)
+
+    # ---
+
+    def _etl_remove_file(self, filename: str):
+        """
+        Removes an ETL file left by an unfinished run, before it is created again.
+        Along with its segments, for a data file.
+        """
+
+        if self._parameters[RESUME] and self._parameters[ETL_FILES]:
+            filepath = os.path.join(
+                self._parameters[TARGET_PATH], self._etl_compressed_name(filename)
+            )
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+            if filename.endswith('.4.sql'):
+                segments = re.compile(
+                    re.escape(filename[:-len('.4.sql')]) + r'\.s\d{4}\.4\.sql(\.gz|\.zst)?'
+                )
+                for i in os.listdir(self._parameters[TARGET_PATH]):
+                    if segments.fullmatch(i):
+                        os.remove(os.path.join(self._parameters[TARGET_PATH], i))
+
+    # ---
+
     def _etl_set_file(self, filename: str, msg: str):
         """ Sets the file to spool output to. """
 
+        if self._skip_output:
+            return
+
         self.log(msg)
 
         if self._parameters[ETL_FILES]:
@@ -449,25 +1018,54 @@ class O2P:
                 if self._etl_file:
                     self._etl_close_file()
                 if self._stage != ETL:
-                    self._file_number += 1
                     filename = (
                         f"{str(self._file_number).zfill(6)}."
                         f"{os.path.basename(filename).rsplit('.', 1)[0]}"
                         f".{self._stage}.sql"
                     )
-                filepath = os.path.join(self._parameters[TARGET_PATH], filename)
-
-                # pylint: disable=consider-using-with        # Need to keep file open after method
-                self._etl_file = (
-                    filename,
-                    open(filepath, 'a', encoding=self._parameters[ENCODING])
+                    self._etl_remove_file(filename)
+                filepath = os.path.join(
+                    self._parameters[TARGET_PATH], self._etl_compressed_name(filename)
                 )
+                self._etl_file = (filename, self._etl_open_file(filepath))
 
             if msg:
                 self._etl_write(f'\n\\echo {msg}\n\n')
 
     # ---
 
+    def _etl_segment(self, rows: int, size: int):
+        """
+        Rolls the data file over to its next segment, when the batch about to be written would
+        take the segment past ``file_segment_rows`` or ``file_segment_bytes``.
+        Segments always hold complete batches, so each can be loaded independently.
+
+        :param rows: the number of rows in the batch
+        :param size: the size of the batch, as written to the file
+        """
+
+        segment = self._segment
+        if not segment:
+            return
+
+        max_rows = self._parameters[FILE_SEGMENT_ROWS]
+        max_bytes = self._parameters[FILE_SEGMENT_BYTES]
+        if segment['rows'] and (
+                (max_rows and segment['rows'] + rows > max_rows)
+                or (max_bytes and segment['bytes'] + size > max_bytes)
+        ):
+            segment['number'] += 1
+            segment['rows'] = segment['bytes'] = 0
+            number = str(segment['number']).zfill(4)
+            self._etl_set_file(
+                f"{segment['stem']}.s{number}.4.sql", f"{segment['msg']}, Segment {number}"
+            )
+
+        segment['rows'] += rows
+        segment['bytes'] += size
+
+    # ---
+
     def _etl_write(self, string: str):
         """ Writes ETL data to the appropriate file """
 
@@ -485,6 +1083,102 @@ class O2P:
 
     # -------------------------------------------
 
+    def _get_chunks(self, table_name: str, resume_chunks: bool) -> List[Dict]:
+        """
+        Gets the table's chunks, recording their boundaries in the journal.
+        When resuming after committed chunks, the recorded boundaries are reused,
+        so the remaining chunks are the rows not yet loaded.
+        """
+
+        if resume_chunks and table_name in self._journal_chunks:
+            return self._journal_chunks[table_name]
+
+        chunks = o2p_data.get_chunks(self, table_name)
+        if len(chunks) > 1:
+            self._journal_write(_CHUNKS, table_name, chunks)
+        return chunks
+
+    # -------------------------------------------
+
+    @contextlib.contextmanager
+    def _index_build(self, table_name: str):
+        """
+        Applies the table's share of ``index_work_mem`` and ``index_workers`` to its sessions,
+        while its keys or indexes are built. The share is taken from what the builds running
+        leave free, by the table's size against the tables due to start alongside it.
+        The workers are limited to those PostgreSQL would use, see ``_index_workers``.
+        """
+
+        builds = self._parameters['_index_builds']
+        with self._index_lock:
+            running = builds['running']
+            slots = max(self._parameters[INDEX_JOBS] - len(running), 1)
+            builds['started'].add(table_name)
+            due = [i for i in builds['tables'] if i not in builds['started']][:slots - 1]
+            size = self._table_size(table_name) + 1     # So empty tables still have a share
+            share = size / (size + sum(self._table_size(i) + 1 for i in due))
+
+            memory = self._index_memory() - sum(i[0] for i in running.values())
+            memory = max(int(memory * share), 1024)
+            workers = (self._parameters[INDEX_WORKERS] or 0) - sum(
+                i[1] for i in running.values()
+            )
+            # A build's share is at least one worker, when parallel builds are asked for,
+            # but no more than PostgreSQL would use for the table's size and memory
+            workers = max(int(workers * share), 1) if self._parameters[INDEX_WORKERS] else 0
+            workers = min(workers, self._index_workers(size, memory))
+            running[table_name] = (memory, workers)
+
+        settings = []
+        if self._parameters[INDEX_WORK_MEM]:
+            settings.append(f"SET maintenance_work_mem = '{running[table_name][0]}kB';")
+        if self._parameters[INDEX_WORKERS] is not None:
+            settings.append(f"SET max_parallel_maintenance_workers = {running[table_name][1]};")
+
+        try:
+            for conn in self._conn_pgs:
+                for cmd in settings:
+                    conn.cursor().execute(cmd)
+            yield
+        finally:
+            with self._index_lock:
+                del running[table_name]
+
+    # ---
+
+    def _index_builds(self, tables: List[str]):
+        """ Starts sharing the index build memory and workers between the tables, in order """
+
+        self._parameters['_index_builds'] = {'tables': tables, 'started': set(), 'running': {}}
+
+    # ---
+
+    def _index_memory(self) -> int:
+        """ The ``index_work_mem`` shared by the index builds, in kB, or 0 when not set """
+
+        if not self._parameters[INDEX_WORK_MEM]:
+            return 0
+        match = _MEMORY.fullmatch(str(self._parameters[INDEX_WORK_MEM]))
+        return int(match['size']) * _MEMORY_UNITS[match['unit'] and match['unit'].upper()]
+
+    # ---
+
+    def _index_workers(self, size: int, memory: int) -> int:
+        """
+        The most workers PostgreSQL would use to build an index of a table of this size,
+        in bytes, with this ``maintenance_work_mem``, in kB, when ``index_work_mem`` is set
+        """
+
+        workers = 0
+        while size >= _PARALLEL_TABLE_SIZE * 3 ** workers:
+            workers += 1
+
+        if self._parameters[INDEX_WORK_MEM]:
+            workers = min(workers, memory // _PARALLEL_WORK_MEM - 1)
+        return max(workers, 0)
+
+    # -------------------------------------------
+
     def _initialise_parameters(self):
         """ Sets defaults and removes exclusions """
 
@@ -494,6 +1188,93 @@ class O2P:
         if COLUMN_DATATYPES not in self._parameters:
             self._parameters[COLUMN_DATATYPES] = []
 
+        # ---
+        #  Data Mode
+
+        if self._parameters[DATA_MODE] not in [BINARY, COPY, INSERT]:
+            raise ValueError(f'Invalid "{DATA_MODE}": "{self._parameters[DATA_MODE]}"')
+
+        self._parameters['_datatypes'] = {}
+
+        # ---
+        #  Transactions
+
+        if self._parameters[TRANSACTIONS] not in [AUTOCOMMIT, BATCH, SINGLE, TABLE]:
+            raise ValueError(f'Invalid "{TRANSACTIONS}": "{self._parameters[TRANSACTIONS]}"')
+        if self._parameters[TRANSACTIONS] == SINGLE and (
+                self._parameters[JOBS] > 1 or self._parameters[CHUNK_JOBS] > 1
+                or self._parameters[INDEX_JOBS] > 1
+        ):
+            raise ValueError(f'"{TRANSACTIONS}" {SINGLE} requires a single job')
+
+        # ---
+        #  Foreign Key Indexes
+
+        if self._parameters[FK_INDEXES] not in [None, CREATE, REPORT]:
+            raise ValueError(f'Invalid "{FK_INDEXES}": "{self._parameters[FK_INDEXES]}"')
+
+        # ---
+        #  Maintenance
+
+        if self._parameters[MAINTENANCE] not in [None, ANALYZE, VACUUM]:
+            raise ValueError(f'Invalid "{MAINTENANCE}": "{self._parameters[MAINTENANCE]}"')
+
+        # ---
+        #  Index Builds
+
+        if self._parameters[INDEX_WORK_MEM] and not _MEMORY.fullmatch(
+                str(self._parameters[INDEX_WORK_MEM])
+        ):
+            raise ValueError(f'Invalid "{INDEX_WORK_MEM}": "{self._parameters[INDEX_WORK_MEM]}"')
+
+        # ---
+        #  Chunk Method
+
+        if self._parameters[CHUNK_METHOD] not in [None, KEY, ROWID]:
+            raise ValueError(f'Invalid "{CHUNK_METHOD}": "{self._parameters[CHUNK_METHOD]}"')
+
+        # ---
+        #  File Compression
+
+        if self._parameters[FILE_COMPRESSION] not in [None, GZIP, ZSTD]:
+            raise ValueError(
+                f'Invalid "{FILE_COMPRESSION}": "{self._parameters[FILE_COMPRESSION]}"'
+            )
+        if self._parameters[FILE_COMPRESSION] == ZSTD and not zstandard:
+            raise ValueError(f'"{FILE_COMPRESSION}" {ZSTD} requires the zstandard package')
+
+        # ---
+        #  File Data Mode
+
+        if self._parameters[FILE_DATA_MODE] not in [COPY, INSERT]:
+            raise ValueError(f'Invalid "{FILE_DATA_MODE}": "{self._parameters[FILE_DATA_MODE]}"')
+
+        # ---
+        #  Refresh
+
+        self._parameters['_refresh_marks'] = {}
+        self._parameters['_refresh_state'] = {}
+        if self._parameters[REFRESH]:
+            if not self._parameters[REFRESH_STATE]:
+                raise ValueError(f'"{REFRESH}" requires "{REFRESH_STATE}"')
+            self._parameters['_refresh_state'] = (
+                o2p_refresh.load_state(self._parameters[REFRESH_STATE])
+            )
+
+        # ---
+        #  Resume
+
+        if self._parameters[RESUME] and self._parameters[ETL_MIGRATE] and (
+                self._parameters[TRANSACTIONS] not in [BATCH, TABLE]
+        ):
+            raise ValueError(f'"{RESUME}" requires "{TRANSACTIONS}" {BATCH} or {TABLE}')
+
+        # Crash recovery empties the unlogged tables, leaving the journal to skip their data
+        if self._parameters[RESUME] and self._parameters[ETL_MIGRATE] and (
+                self._parameters[BULK_LOAD]
+        ):
+            raise ValueError(f'"{RESUME}" is not available with "{BULK_LOAD}", when migrating')
+
         # ---
         #  Exclude
 
@@ -567,48 +1348,139 @@ class O2P:
 
     # -------------------------------------------
 
+    def _journal_done(self, *step) -> bool:
+        """ Checks the journal for a completed step, when resuming """
+
+        return step in self._journal
+
+    # ---
+
+    def _journal_load(self):
+        """ Reads the steps completed by the previous run from the journal, when resuming """
+
+        if not (self._parameters[RESUME] and self._parameters['_target_path_validated']):
+            return
+
+        journal_file = os.path.join(self._parameters[TARGET_PATH], '_journal_.json')
+        if os.path.exists(journal_file):
+            with open(journal_file, 'r', encoding='utf-8') as file:
+                for step in [json.loads(i) for i in file if i.strip()]:
+                    if step[0] == _CHUNKS:
+                        self._journal_chunks[step[1]] = step[2]
+                    else:
+                        self._journal.add(tuple(step))
+        self.log(f'Resuming, {len(self._journal)} steps completed')
+
+    # ---
+
+    def _journal_write(self, *step):
+        """ Records a completed, and committed, step, or a table's chunks, in the journal """
+
+        if not self._parameters['_target_path_validated']:
+            return
+
+        journal_file = os.path.join(self._parameters[TARGET_PATH], '_journal_.json')
+        with self._journal_lock:
+            with open(journal_file, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(step) + '\n')
+            if step[0] == _CHUNKS:
+                self._journal_chunks[step[1]] = step[2]
+            else:
+                self._journal.add(step)
+
+    # -------------------------------------------
+
+    def _parallel(self, function: Callable, items: List, jobs: int, locks: Dict = None):
+        """
+        Runs the function for each item, over a pool of worker sessions when jobs is above one.
+        Each worker has its own Oracle and PostgreSQL connections and ETL file.
+
+        :param function: the function to run, called with the O2P worker and the item.
+        :param items: the items to process, in the order to start them.
+        :param jobs: the maximum number of items to process concurrently.
+        :param locks: the tables locked by each item, items sharing a table are not run together.
+        """
+
+        if jobs <= 1 or len(items) <= 1:
+            for item in items:
+                function(self, item)
+            return
+
+        self._etl_close_file()
+        workers = queue.SimpleQueue()
+        pool_size = min(jobs, len(items))
+        for _ in range(pool_size):
+            workers.put(self._worker())
+
+        def run(item):
+            worker = workers.get()
+            try:
+                function(worker, item)
+            finally:
+                workers.put(worker)
+
+        # Items are tracked by position, as they may not be hashable, such as chunks
+        locked_by = [locks.get(i, set()) if locks else set() for i in items]
+        pending = list(range(len(items)))
+        running = {}
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(pool_size) as executor:
+                while pending or running:
+                    # Starts the first items in order, skipping any locking a table in use
+                    locked = set().union(*[locked_by[i] for i in running.values()])
+                    for position in list(pending):
+                        if len(running) >= pool_size:
+                            break
+                        if not locked_by[position] & locked:
+                            pending.remove(position)
+                            locked.update(locked_by[position])
+                            running[executor.submit(run, items[position])] = position
+                    done, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        del running[future]
+                        if future.exception():
+                            pending.clear()
+                            concurrent.futures.wait(running)
+                            future.result()
+        finally:
+            while not workers.empty():
+                workers.get()._close()
+
+    # -------------------------------------------
+
     def _populate_identity_sequences(self):
         """ Populates the sequences parameter for identity columns """
 
         tables = self._parameters[TABLES]
         exclude = self._parameters[EXCLUDE]
 
-        query = (
-            "SELECT table_name, column_name, sequence_name "
-            "  FROM user_tab_identity_cols"
-        )
-
         try:
-            for i in self.oracle_query(query):
+            for i in self.catalog_query('identity_columns')[0]:
                 if (tab_col := f'{i[0]}.{i[1]}') not in exclude and i[0] in tables:
                     if i[2] not in self._parameters['_sequences']:
                         self._parameters['_sequences'].append(i[2])
                     self._parameters['_table_sequences'][tab_col] = i[2]
         except cx_Oracle.DatabaseError:
-            pass  # Assume pre Oracle 12 database
+            self._catalog['identity_columns'] = ({}, {})  # Assume pre Oracle 12 database
 
     # -------------------------------------------
 
     def _populate_sequences(self):
         """ Gets all the sequence names from the user_sequences view """
 
-        query = "SELECT sequence_name FROM user_sequences"
-        self._parameters['_sequences'] = [i[0] for i in self.oracle_query(query)]
+        self._parameters['_sequences'] = [i[0] for i in self.catalog_query('sequences')[0]]
 
     # -------------------------------------------
 
     def _populate_tables(self):
         """ Gets all the table names from the user_tables view """
 
-        query = (
-            "SELECT ut.table_name, ut.tablespace_name"
-            "  FROM user_tables ut"
-            " WHERE ut.status = 'VALID'"
-            "   AND tablespace_name IS NOT NULL"
-            "   AND SUBSTR(table_name,1,4) != 'SYS_'"
-            " ORDER BY 1"
-        )
-        data = {i[0]: self.tablespace_map(TABLE, i[0], i[1]) for i in self.oracle_query(query)}
+        data = {
+            i[0]: self.tablespace_map(TABLE, i[0], i[1]) for i in self.catalog_query('tables')[0]
+        }
         if self._parameters.get(TABLES):
             self._parameters['_tables'] = {
                 i: self.tablespace_map(TABLE, i, data.get(i)) for i in self._parameters[TABLES]
@@ -622,22 +1494,7 @@ class O2P:
     def _populate_triggers(self):
         """ Gets all the trigger names from the user_triggers view """
 
-        triggers = (
-            ' OR '.join([f"trigger_name = '{i}'" for i in self._parameters[TRIGGERS]])
-            or ' 1=1 '
-        )
-
-        query = (
-            "SELECT ut.table_name,"
-            "       ut.trigger_name,"
-            "       ut.trigger_type,"
-            "       ut.triggering_event,"
-            "       ut.when_clause"
-            "  FROM user_triggers ut"
-            " WHERE ut.status = 'ENABLED'"
-            "   AND ut.base_object_type = 'TABLE'"
-            f"  AND ({triggers})"
-        )
+        triggers = self._parameters[TRIGGERS]
 
         self._parameters['_triggers'] = [{
             'table_name': i[0],
@@ -645,7 +1502,23 @@ class O2P:
             'trigger_type': i[2],
             'triggering_event': i[3],
             'when_clause': i[4]
-        } for i in self.oracle_query(query) if f'TRIGGER {i[1]}' not in self._parameters[EXCLUDE]]
+        } for i in self.catalog_query('triggers')[0]
+            if (not triggers or i[1] in triggers)
+            and f'TRIGGER {i[1]}' not in self._parameters[EXCLUDE]]
+
+    # -------------------------------------------
+
+    def _postgresql_connect(self, conn_string: str) -> psycopg2.connect:
+        """ Connects to PostgreSQL and sets up the session """
+
+        conn = psycopg2.connect(conn_string)
+        conn.set_session(autocommit=self._parameters[TRANSACTIONS] == AUTOCOMMIT)
+        if self._parameters[BULK_LOAD]:
+            for cmd in self._bulk_load_settings():
+                conn.cursor().execute(cmd)
+        if self._parameters[DATA_MODE] == BINARY:
+            conn.set_client_encoding('UTF8')   # Binary text values are encoded as utf-8
+        return conn
 
     # -------------------------------------------
 
@@ -664,19 +1537,141 @@ class O2P:
 
     # -------------------------------------------
 
+    def _resume_table(self, table_name: str) -> bool:
+        """
+        Prepares an unfinished table to be created again, when resuming.
+        Unless some of its chunks were committed, then the table is kept and loading continues.
+
+        :return: True if the table is kept
+        """
+
+        if not self._parameters[RESUME]:
+            return False
+
+        pgs_table_name = self.rename_object(TABLE, table_name)
+        if any(
+                len(i) == 3 and i[:2] == (TABLE, table_name) and isinstance(i[2], int)
+                for i in self._journal
+        ):
+            self.log(f'{pgs_table_name} Resuming after the committed chunks')
+            return True
+
+        if self._parameters[ETL_FILES]:
+            for filename in os.listdir(self._parameters[TARGET_PATH]):
+                if filename.startswith(f'{pgs_table_name}.') and filename.endswith(
+                        tuple([f'.{i}.sql{j}' for i in [3, 4] for j in _COMPRESSION_SUFFIXES])
+                ):
+                    os.remove(os.path.join(self._parameters[TARGET_PATH], filename))
+
+        if self._parameters[ETL_MIGRATE]:
+            self.postgresql_cmd(f"DROP TABLE IF EXISTS %%schema%%.{pgs_table_name} CASCADE;")
+            self.postgresql_commit()
+
+        return False
+
+    # -------------------------------------------
+
+    def _save_snapshot(self):
+        """ Saves the complete catalog to the snapshot file """
+
+        for name in o2p_catalog.QUERIES:
+            try:
+                self.catalog_query(name)
+            except cx_Oracle.DatabaseError:
+                self._catalog[name] = ({}, {})   # View not available in this database version
+
+        o2p_catalog.save_snapshot(self._parameters[SNAPSHOT_SAVE], self._catalog)
+        self.log(f'Catalog snapshot saved: {self._parameters[SNAPSHOT_SAVE]}')
+
+    # -------------------------------------------
+
+    @contextlib.contextmanager
+    def _skipped_output(self):
+        """ Runs a step without writing to the ETL files or PostgreSQL, for its state only """
+
+        self._skip_output = True
+        try:
+            yield
+        finally:
+            self._skip_output = False
+
+    # -------------------------------------------
+
+    def _table_size(self, table_name: str) -> int:
+        """ The size of the table's segments in Oracle, in bytes, or 0 when not known """
+
+        records, cols = self.catalog_query('table_sizes', table_name)
+        return (records[0][cols['bytes']] or 0) if records else 0
+
+    # -------------------------------------------
+
+    @contextlib.contextmanager
+    def _transaction(self, name: str):
+        """
+        Commits the work done within the context, according to the ``transactions`` mode,
+        or rolls it back when an exception is raised.
+        """
+
+        try:
+            yield
+        except Exception:
+            if self._parameters[TRANSACTIONS] != AUTOCOMMIT:
+                self.postgresql_rollback()
+                self.log(f'{name} failed, rolled back')
+            raise
+
+        if self._parameters[TRANSACTIONS] != SINGLE:
+            self.postgresql_commit()
+
+    # -------------------------------------------
+
     def _validate_target_path(self):
         """ Validates the target path and creates required directoeies """
 
-        if self._parameters[ETL_FILES]:
+        if self._parameters[ETL_FILES] or self._parameters[RESUME]:
             if not self._parameters[TARGET_PATH]:
                 raise ValueError('Target path not set')
         if TARGET_PATH in self._parameters and not self._parameters['_target_path_validated']:
             self._parameters[TARGET_PATH] = os.path.normpath(self._parameters[TARGET_PATH])
-            if os.path.exists(self._parameters[TARGET_PATH]):
+            if not self._parameters[RESUME] and os.path.exists(self._parameters[TARGET_PATH]):
                 raise ValueError(f'Target path exists: "{self._parameters[TARGET_PATH]}"')
-            os.makedirs(self._parameters[TARGET_PATH])
+            os.makedirs(self._parameters[TARGET_PATH], exist_ok=True)
             self._parameters['_target_path_validated'] = True
 
+    # -------------------------------------------
+
+    def _write_manifest(self, files: List[str]):
+        """
+        Writes the manifest of the ETL files ``_manifest_.json``, for loading them in parallel,
+        with the session settings and file encoding used by ``replay``.
+        """
+
+        manifest_file = os.path.join(self._parameters[TARGET_PATH], '_manifest_.json')
+        with open(manifest_file, 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'schema': self._parameters[POSTGRES_SCHEMA],
+                    'encoding': self._parameters[ENCODING],
+                    'settings': self._bulk_load_settings() if self._parameters[BULK_LOAD] else [],
+                    'files': o2p_replay.get_manifest(files)
+                }, file, indent=2
+            )
+
+    # -------------------------------------------
+
+    def _worker(self) -> 'O2P':
+        """ Creates a worker, sharing the parameters and log, with its own sessions """
+
+        worker = copy.copy(self)
+        worker._conn_ora = None
+        worker._etl_file = None
+        worker._segment = None
+        worker._conn_pgs = [
+            self._postgresql_connect(i) for i in self._parameters[POSTGRES_CONN]
+        ] if self._conn_pgs else []
+
+        return worker
+
 
 # -----------------------------------------------
 
@@ -685,7 +1680,21 @@ def _get_parameters(**kwargs) -> Dict:
     """ Parameters dictionary with default and specified values """
 
     parameters = {
+        BATCH_BYTES: 0,
+        BATCH_MIN_ROWS: 100,
+        BATCH_SECONDS: 10,
+        BULK_LOAD: False,
+        BULK_LOAD_WORK_MEM: '1GB',
+        CHUNK_BYTES: 0,
+        CHUNK_JOBS: 1,
+        CHUNK_METHOD: None,
+        CHUNK_ROWS: 0,
+        COMMIT_BATCHES: 1,
+        COMMIT_BYTES: 0,
         CONSOLE: True,
+        DATA_MODE: INSERT,
+        DEFER_FK_VALIDATION: False,
+        DEFER_KEYS: False,
         DROP_SCHEMA: True,
         ENCODING: 'utf-8-sig',
         ETL_CONSTRAINTS: True,
@@ -694,9 +1703,33 @@ def _get_parameters(**kwargs) -> Dict:
         ETL_FILES: True,
         ETL_MIGRATE: True,
         ETL_TRIGGERS: False,
+        FILE_COMPRESSION: None,
+        FILE_COMPRESSION_DDL: False,
+        FILE_DATA_MODE: INSERT,
+        FILE_SEGMENT_BYTES: 0,
+        FILE_SEGMENT_ROWS: 0,
+        FK_INDEXES: None,
+        INDEX_JOBS: 1,
+        INDEX_WORK_MEM: None,
+        INDEX_WORKERS: None,
         INSERT_ROWS: 10_000,
+        JOBS: 1,
+        LOB_INLINE_SIZE: 0,
+        MAINTENANCE: None,
+        MAINTENANCE_JOBS: None,
+        ORACLE_ARRAYSIZE: 1000,
+        ORACLE_PREFETCH_ROWS: 1000,
+        ORACLE_STMT_CACHE_SIZE: 50,
+        PIPELINE_DEPTH: 0,
         POSTGRES_SCHEMA: 'O2P',
+        REFRESH: False,
+        REFRESH_COLUMNS: {},
+        REFRESH_STATE: None,
+        RESUME: False,
+        SNAPSHOT_LOAD: None,
+        SNAPSHOT_SAVE: None,
         TABLESPACE_MAP: {},
+        TRANSACTIONS: AUTOCOMMIT,
         '_pls2pgs': {
             ":OLD.": "OLD.",
             ":NEW.": "NEW.",
@@ -726,10 +1759,12 @@ def _get_parameters(**kwargs) -> Dict:
 
 def _output_type_handler(cursor, name, defaultType, size, precision, scale):        # noqa
     """
-    Converts Clob to Long to improve performance.
+    Converts Clob to Long to improve performance, except for columns aliased as LOB locators.
     Parameter names and order are specified by cx_Oracle
     """
 
+    if name.startswith(LOB_LOCATOR):
+        return None
     if defaultType == cx_Oracle.CLOB:
         return cursor.var(cx_Oracle.LONG_STRING, arraysize=cursor.arraysize)
     if defaultType == cx_Oracle.BLOB:
@@ -0,0 +1,133 @@
+"""
+
+easyo2p: _refresh.py
+High-water marks for refreshing the rows changed since a previous load
+
+"""
+
+# -----------------------------------------------
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import datetime
+import json
+
+from easyo2p import CONSTRAINT, REFRESH, REFRESH_COLUMNS
+if TYPE_CHECKING:
+    from easyo2p import O2P
+
+# -----------------------------------------------
+
+# Changes are found by the SCN of the row's last change, unless a column is configured
+_ROWSCN = 'ORA_ROWSCN'
+
+# -----------------------------------------------
+
+
+def _get_column(o2p: O2P, table_name: str) -> str:
+    """ Gets the column holding the change mark for the table """
+
+    return o2p.get_parameter(REFRESH_COLUMNS).get(table_name, _ROWSCN)
+
+
+# ---
+
+
+def get_conflict(o2p: O2P, table_name: str, columns: List) -> Optional[str]:
+    """
+    Creates the ON CONFLICT clause which updates the existing rows, against the table's primary
+    key, or its first unique key when there is no primary key.
+
+    :return: the clause, or None when the table has no key to match the rows on
+    """
+
+    constraints, cols = o2p.catalog_query('keys', table_name)
+    keys = {}
+    for constraint in constraints:
+        if not o2p.is_excluded(CONSTRAINT, constraint[cols['constraint_name']]):
+            keys.setdefault(
+                (constraint[cols['constraint_type']] != 'P', constraint[cols['constraint_name']]),
+                []
+            ).append(constraint[cols['column_name']])
+
+    if not keys:
+        return None
+
+    key_columns = keys[min(keys)]
+    pgs_key_columns = [o2p.rename_column(table_name, i) for i in key_columns]
+    updates = ', '.join([
+        f'{i} = EXCLUDED.{i}' for i in [o2p.rename_column(table_name, i) for i in columns]
+        if i not in pgs_key_columns
+    ])
+
+    return (
+        f" ON CONFLICT ({','.join(pgs_key_columns)})"
+        + (f" DO UPDATE SET {updates}" if updates else " DO NOTHING")
+    )
+
+
+# ---
+
+
+def get_mark(o2p: O2P, table_name: str) -> Any:
+    """ Gets the table's current high-water mark, taken before its rows are extracted """
+
+    column_name = _get_column(o2p, table_name)
+    return o2p.oracle_query(f"SELECT MAX({column_name}) FROM {table_name}")[0][0]
+
+
+# ---
+
+
+def get_where(o2p: O2P, table_name: str, chunk: Dict) -> Tuple[str, Dict]:
+    """
+    Adds the rows changed since the previous high-water mark to the chunk's where clause
+
+    :return: tuple of the where clause and the bind values
+    """
+
+    where = chunk.get('where', '')
+    binds = dict(chunk.get('binds', {}))
+
+    mark = o2p.get_parameter('_refresh_state').get(table_name)
+    if o2p.get_parameter(REFRESH) and mark is not None:
+        where += f"{' AND' if where else ' WHERE'} {_get_column(o2p, table_name)} > :refresh_mark"
+        binds['refresh_mark'] = mark
+
+    return where, binds
+
+
+# -----------------------------------------------
+
+
+def load_state(filename: str) -> Dict:
+    """ Loads the high-water marks, by table name """
+
+    with open(filename, 'r', encoding='utf-8') as file:
+        state = json.load(file)
+
+    return {
+        table_name: datetime.datetime.fromisoformat(mark['value']) if mark['datetime']
+        else mark['value'] for table_name, mark in state.items()
+    }
+
+
+# ---
+
+
+def save_state(filename: str, marks: Dict):
+    """ Saves the high-water marks, by table name """
+
+    state = {
+        table_name: {
+            'datetime': isinstance(mark, datetime.datetime),
+            'value': mark.isoformat() if isinstance(mark, datetime.datetime) else mark
+        } for table_name, mark in marks.items()
+    }
+
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=2)
+
+
+# -----------------------------------------------
+# End.
@@ -0,0 +1,403 @@
+"""
+
+easyo2p: _replay.py
+Replays the ETL files on PostgreSQL, in parallel, in the order their dependencies allow
+
+"""
+
+# -----------------------------------------------
+
+from __future__ import annotations
+from typing import IO, Callable, Dict, Iterator, List, Optional, Set
+import concurrent.futures
+import gzip
+import io
+import json
+import os
+import queue
+import re
+import time
+
+import psycopg2
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# -----------------------------------------------
+
+# ETL filenames, a number for files created after the ETL, the table or file name,
+# the data chunk and segment, the step within the stage, the stage and any compression extension
+ETL_FILE_NAME = re.compile(
+    r'((?P<number>\d{6})\.)?(?P<name>.+?)(\.(?P<chunk>\d{4}))?(\.s(?P<segment>\d{4}))?'
+    r'(\.(?P<step>logged|keys|validate))?\.(?P<stage>[1-7])\.sql(\.gz|\.zst)?'
+)
+
+# Within the constraints stage, tables are set logged, as logged tables may only reference logged
+# tables, then keys are created, before the foreign keys referencing them, which are validated
+# once all the constraints are created
+_STEP_ORDER = {'logged': 0, 'keys': 1, None: 2, 'validate': 3}
+
+# Tables referenced by the foreign keys in a constraints file
+_REFERENCES = re.compile(r'\bREFERENCES\s+(?:\w+\.)?(\w+)\s*\(')
+
+# Copy blocks written by the data files, ending with a line holding only \.
+_COPY = re.compile(r'COPY\s.+\sFROM\s+stdin;\s*', re.IGNORECASE)
+_COPY_END = '\\.'
+
+# Statements are sent in groups of about this size, rather than one at a time
+_SEND_SIZE = 1_048_576
+
+# -----------------------------------------------
+
+
+def get_manifest(files: List[str]) -> List[Dict]:
+    """
+    Describes the ETL files, for the manifest written with the run script.
+    A file can start once all the files of the earlier stages are complete,
+    or, for the data files, once the files it depends on are.
+    ``replay`` refines this, see ``_get_dependencies``.
+
+    :param files: the filenames in the target path
+    :return: the stage, table, chunk, segment, step and dependencies of each ETL file
+    """
+
+    manifest = []
+    for file in sorted(files):
+        if not (match := ETL_FILE_NAME.fullmatch(file)):
+            continue
+        table_file = match['stage'] in ['3', '4', '5', '7'] and not match['number']
+        manifest.append({
+            'file': file,
+            'stage': int(match['stage']),
+            'table': match['name'] if table_file else None,
+            'chunk': int(match['chunk']) if match['chunk'] else None,
+            'segment': int(match['segment']) if match['segment'] else None,
+            'step': match['step'],
+            'depends_on': (
+                [i for i in files if re.fullmatch(
+                    re.escape(match['name']) + r'\.3\.sql(\.gz|\.zst)?', i
+                )] if match['stage'] == '4' else None
+            )
+        })
+
+    return manifest
+
+
+# ---
+
+
+def step_order(file: str) -> int:
+    """ Orders the ETL files of a stage by their step, for the run script """
+
+    match = ETL_FILE_NAME.fullmatch(file)
+    return _STEP_ORDER[match['step'] if match else None]
+
+
+# -----------------------------------------------
+
+
+def _get_dependencies(
+        target_path: str, manifest: List[Dict], encoding: str
+) -> Dict[str, Set[str]]:
+    """
+    Builds the dependency graph of the ETL files.
+    Sequences before tables, data after its table, keys and constraints after the table's data,
+    and foreign keys after the data and keys of the tables they reference, once set logged.
+    Foreign keys created not valid are validated once all the other constraints are created,
+    and the tables are vacuumed and analyzed last.
+    """
+
+    stages = {i: [j['file'] for j in manifest if j['stage'] == i] for i in range(1, 8)}
+    tables = {}
+    for i in manifest:
+        if i['table']:
+            tables.setdefault(i['table'], {}).setdefault(i.get('step') or i['stage'], []).append(
+                i['file']
+            )
+
+    dependencies = {}
+    for i in manifest:
+        file, stage, table = i['file'], i['stage'], tables.get(i['table'], {})
+        earlier = {k for j in range(1, stage) for k in stages[j]}
+
+        if stage in [1, 6]:
+            position = stages[stage].index(file)
+            depends = earlier | set(stages[stage][position - 1:position])
+        elif stage == 4 and table.get(3):
+            depends = set(table[3])
+        elif stage == 5 and i.get('step') == 'validate':
+            depends = {
+                j['file'] for j in manifest if j['stage'] == 5 and j.get('step') != 'validate'
+            }
+        elif stage == 5 and i['table'] and i.get('step') == 'logged':
+            depends = set(table.get(3, []) + table.get(4, []))
+        elif stage == 5 and i['table'] and i.get('step') == 'keys':
+            depends = set(table.get(3, []) + table.get(4, []) + table.get('logged', []))
+        elif stage == 5 and i['table']:
+            depends = set()
+            references = _get_references(os.path.join(target_path, file), encoding)
+            for reference in references | {i['table']}:
+                for files in [
+                        tables.get(reference, {}).get(j, []) for j in [3, 4, 'logged', 'keys']
+                ]:
+                    depends.update(files)
+        else:
+            depends = earlier
+
+        # Data and constraints files also wait for the sequences and pre files, through the table
+        if stage in [3, 4, 5] and not depends:
+            depends = earlier
+        dependencies[file] = depends
+
+    return dependencies
+
+
+# ---
+
+
+def _get_references(filepath: str, encoding: str) -> Set[str]:
+    """ Gets the tables referenced by the foreign keys in a constraints file """
+
+    with _open(filepath, encoding) as file:
+        return set(_REFERENCES.findall(file.read()))
+
+
+# ---
+
+
+def _open(filepath: str, encoding: str) -> IO:
+    """ Opens an ETL file for reading, decompressing it when compressed """
+
+    # pylint: disable=consider-using-with        # Closed by the caller
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, 'rt', encoding=encoding)
+    if filepath.endswith('.zst'):
+        if not zstandard:
+            raise ValueError(f'Reading "{filepath}" requires the zstandard package')
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(filepath, 'rb'), read_across_frames=True
+        )
+        return io.TextIOWrapper(reader, encoding=encoding)
+    return open(filepath, 'r', encoding=encoding)
+
+
+# -----------------------------------------------
+
+
+class _CopyData(io.TextIOBase):
+    """ Reads the rows of a copy block from the file's lines, up to the end marker """
+
+    def __init__(self, lines: Iterator[str]):
+        super().__init__()
+        self._lines = lines
+        self._buffer = ''
+        self._ended = False
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        while not self._ended and (size is None or size < 0 or len(self._buffer) < size):
+            line = next(self._lines, None)
+            if line is None or line.rstrip('\r\n') == _COPY_END:
+                self._ended = True
+            else:
+                self._buffer += line
+        size = len(self._buffer) if size is None or size < 0 else size
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        return self.read(size)
+
+
+# ---
+
+
+def _statements(file: IO) -> Iterator[tuple]:
+    """
+    Splits an ETL file into groups of complete statements and copy blocks.
+    Quotes and dollar quotes are followed, so only the end of a statement ends a group.
+    psql meta commands, such as \\echo, are skipped.
+
+    :return: generator of tuples, either ('sql', statements) or ('copy', command, data)
+    """
+
+    lines = iter(file)
+    statements = []
+    size = 0
+    quoted = dollar_quoted = False
+
+    for line in lines:
+        complete = not (quoted or dollar_quoted)
+        if complete and line.startswith('\\'):
+            continue
+
+        if complete and _COPY.fullmatch(line):
+            if statements:
+                yield 'sql', ''.join(statements)
+                statements, size = [], 0
+            data = _CopyData(lines)
+            yield 'copy', line.strip().rstrip(';'), data
+            data.read()   # Skips any rows not read by the copy
+            continue
+
+        statements.append(line)
+        size += len(line)
+        for part in re.findall(r"\$\$|'", line):
+            if part == '$$' and not quoted:
+                dollar_quoted = not dollar_quoted
+            elif part == "'" and not dollar_quoted:
+                quoted = not quoted
+
+        if size >= _SEND_SIZE and not (quoted or dollar_quoted) and line.rstrip().endswith(';'):
+            yield 'sql', ''.join(statements)
+            statements, size = [], 0
+
+    if ''.join(statements).strip():
+        yield 'sql', ''.join(statements)
+
+
+# ---
+
+
+def _run_file(conn, filepath: str, encoding: str, autocommit: bool = False):
+    """
+    Runs an ETL file on the connection, as a single transaction,
+    or statement by statement when autocommit, as VACUUM requires
+    """
+
+    conn.autocommit = autocommit
+    cursor = conn.cursor()
+    try:
+        with _open(filepath, encoding) as file:
+            for statement in _statements(file):
+                if statement[0] == 'copy':
+                    cursor.copy_expert(statement[1], statement[2])
+                else:
+                    cursor.execute(statement[1])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.autocommit = False
+
+
+# -----------------------------------------------
+
+
+def replay(
+        target_path: str,
+        postgres_conn: str,
+        jobs: int = 4,
+        drop_schema: bool = False,
+        encoding: str = None,
+        log: Callable = print
+) -> Dict[str, float]:
+    """
+    Replays the ETL files created by ``O2P.do_etl`` on PostgreSQL, over a pool of connections.
+    Each file runs in its own transaction, as soon as the files it depends on are complete.
+
+    :param target_path: the target path holding the ETL files
+    :param postgres_conn: the psycopg2 connection string
+    :param jobs: the number of files run at the same time, each with its own connection
+    :param drop_schema: drop the schema first, if it exists
+    :param encoding: the encoding of the ETL files, default the encoding in the manifest
+    :param log: function called with the progress messages
+    :return: the time taken to run each file, in seconds
+    """
+
+    manifest_file = os.path.join(target_path, '_manifest_.json')
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    else:
+        manifest = {'files': get_manifest(os.listdir(target_path))}
+
+    schema = manifest.get('schema')
+    encoding = encoding or manifest.get('encoding', 'utf-8-sig')
+    dependencies = _get_dependencies(target_path, manifest['files'], encoding)
+    stages = {i['file']: i['stage'] for i in manifest['files']}
+    sizes = {i: os.path.getsize(os.path.join(target_path, i)) for i in dependencies}
+
+    # Maintenance runs biggest tables first, by the size of their data files
+    for i in manifest['files']:
+        if i['stage'] == 7 and i['table']:
+            sizes[i['file']] = sum(
+                sizes[j['file']] for j in manifest['files']
+                if j['stage'] == 4 and j['table'] == i['table']
+            )
+
+    def run(file: str) -> float:
+        conn = connections.get()
+        try:
+            start = time.perf_counter()
+            _run_file(conn, os.path.join(target_path, file), encoding, stages[file] == 7)
+            return time.perf_counter() - start
+        finally:
+            connections.put(conn)
+
+    connections = queue.SimpleQueue()
+    running = {}
+    timings = {}
+    pending = dict(dependencies)
+    start = time.perf_counter()
+
+    try:
+        for _ in range(max(jobs, 1)):
+            conn = psycopg2.connect(postgres_conn)
+            connections.put(conn)
+            for setting in manifest.get('settings', []):
+                conn.cursor().execute(setting)
+            if schema:
+                conn.cursor().execute(f"SET search_path TO {schema}")
+            conn.commit()
+
+        if schema:
+            conn = connections.get()
+            connections.put(conn)
+            if drop_schema:
+                conn.cursor().execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            conn.cursor().execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+            conn.commit()
+
+        with concurrent.futures.ThreadPoolExecutor(max(jobs, 1)) as executor:
+            while pending or running:
+                # The largest files are started first, so they are not left until last
+                ready = sorted(
+                    [i for i, j in pending.items() if not j - set(timings)],
+                    key=lambda i: sizes[i], reverse=True
+                )
+                for file in ready[:max(jobs, 1) - len(running)]:
+                    del pending[file]
+                    running[executor.submit(run, file)] = file
+                if not running:
+                    raise RuntimeError(f'Unable to resolve dependencies: {sorted(pending)}')
+
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    file = running.pop(future)
+                    timings[file] = future.result()
+                    log(
+                        f'{file}: {timings[file]:.1f}s'
+                        f' ({len(timings)}/{len(dependencies)} files)'
+                    )
+    finally:
+        # The files still running return their connections to the queue when they finish
+        for future in running:
+            future.cancel()
+        concurrent.futures.wait(running)
+        while not connections.empty():
+            connections.get().close()
+
+    log(f'Replay complete: {len(timings)} files, {time.perf_counter() - start:.1f}s')
+    return timings
+
+
+# -----------------------------------------------
+# End.
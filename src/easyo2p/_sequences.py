@@ -21,14 +21,12 @@ def main(o2p: O2P):
     """ Creates a set of sql files for creating sequences in postgresql """
 
     sequences = o2p.get_parameter('_sequences')
+    records, cols = o2p.catalog_query('sequences')
 
-    query = (
-        "SELECT us.sequence_name, us.increment_by, us.last_number"
-        "  FROM user_sequences us"
-        " WHERE " + (' OR '.join([f"us.sequence_name = '{i}'" for i in sequences]))
-    )
-
-    data = {i[0]: [i[1], i[2]] for i in o2p.oracle_query(query)}
+    data = {
+        i[cols['sequence_name']]: [i[cols['increment_by']], i[cols['last_number']]]
+        for i in records if i[cols['sequence_name']] in sequences
+    }
 
     for i in sorted(list(data)):
         sequence_name = o2p.rename_object(SEQUENCE, i)
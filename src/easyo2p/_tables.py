@@ -12,7 +12,10 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Dict, List
 
 import easyo2p
-from easyo2p import COLUMN, CONSTRAINT, ETL_COMMENTS, ETL_CONSTRAINTS, SEQUENCE, TABLE
+from easyo2p import (
+    BULK_LOAD, COLUMN, CONSTRAINT, DEFER_KEYS, ETL_COMMENTS, ETL_CONSTRAINTS, ETL_DATA, SEQUENCE,
+    TABLE
+)
 if TYPE_CHECKING:
     from easyo2p import O2P
 
@@ -24,13 +27,7 @@ def _process_create_comments_cols(o2p: O2P, table_name: str):
 
     pgs_table_name = o2p.rename_object(TABLE, table_name)
 
-    query = (
-        "SELECT column_name, REPLACE(comments, '''', '''''') comments "
-        "  FROM user_col_comments "
-        f"WHERE table_name = '{table_name}'"
-    )
-
-    records, cols = o2p.oracle_query(query, True)
+    records, cols = o2p.catalog_query('col_comments', table_name)
 
     for record in records:
         column_name = record[cols['column_name']]
@@ -54,15 +51,9 @@ def _process_create_comments_tab(o2p: O2P, table_name: str):
 
     pgs_table_name = o2p.rename_object(TABLE, table_name)
 
-    query = (
-        "SELECT REPLACE(comments, '''', '''''') comments"
-        "  FROM user_tab_comments "
-        f"WHERE table_name = '{table_name}'"
-    )
+    records, cols = o2p.catalog_query('tab_comments', table_name)
 
-    records = o2p.oracle_query(query)
-
-    for comment in [i[0] for i in records if i[0]]:
+    for comment in [i[cols['comments']] for i in records if i[cols['comments']]]:
         comment = comment.replace('\n', ' ')
         o2p.postgresql_cmd(f"\nCOMMENT ON TABLE %%schema%%.{pgs_table_name} IS '{comment}';\n")
 
@@ -103,20 +94,10 @@ def _add_puk_constraint(o2p: O2P, table_name: str, constraint_data: Dict):
 def _process_create_puks(o2p: O2P, table_name: str):
     """ Builds the primary and unique key constraint statements """
 
-    query = (
-        "SELECT uc.constraint_name, uc.constraint_type, ucc.column_name, ui.tablespace_name"
-        "  FROM user_constraints uc, user_cons_columns ucc, user_indexes ui"
-        " WHERE uc.constraint_type IN ('P','U')"
-        f"  AND uc.table_name = '{table_name}'"
-        "   AND uc.constraint_name = ucc.constraint_name"
-        "   AND uc.index_name = ui.index_name"
-        " ORDER BY uc.constraint_name, ucc.position"
-    )
-
     constraint_data = {}
     constraint_name = ''
 
-    constraints, cols = o2p.oracle_query(query, True)
+    constraints, cols = o2p.catalog_query('keys', table_name)
 
     for constraint in constraints:
         if constraint_name != constraint[cols['constraint_name']]:
@@ -198,17 +179,17 @@ def _include_column(o2p: O2P, table_name: str, column_name: str):
 # -----------------------------------------------
 
 
-def _column_order(o2p: O2P, table_name: str):
-    """ Creates the user_tab_columns order by clause """
+def _column_order(o2p: O2P, table_name: str, records: List, cols: Dict) -> List:
+    """ Orders the user_tab_columns records, moving any reordered columns first """
 
     param = o2p.get_parameter(easyo2p.COLUMN_REORDER)
     if param and (column_reorder := param.get(table_name)):
-        return (
-            '(CASE column_name '
-            + ''.join([f"WHEN '{cn}' THEN {i} " for i, cn in enumerate(column_reorder)])
-            + f'ELSE {len(column_reorder)} END), column_id'
-        )
-    return 'column_id'
+        positions = {cn: i for i, cn in enumerate(column_reorder)}
+        return sorted(records, key=lambda record: (
+            positions.get(record[cols['column_name']], len(column_reorder)),
+            record[cols['column_id']]
+        ))
+    return records
 
 
 # -----------------------------------------------
@@ -218,6 +199,7 @@ def _process_create_table(o2p: O2P, table_name: str, columns: List):
     """ Builds the create table statement """
 
     lines = []
+    datatypes = o2p.get_parameter('_datatypes')
 
     column_datatypes = {
         j[0]: j[1] for j in [
@@ -227,14 +209,8 @@ def _process_create_table(o2p: O2P, table_name: str, columns: List):
 
     # ---
 
-    query = (
-        "SELECT column_name, data_type, data_length, data_precision, data_scale, nullable"
-        "  FROM user_tab_columns "
-        f"WHERE table_name = '{table_name}'"
-        f" ORDER BY {_column_order(o2p, table_name)}"
-    )
-
-    records, cols = o2p.oracle_query(query, True)
+    records, cols = o2p.catalog_query('columns', table_name)
+    records = _column_order(o2p, table_name, records, cols)
 
     # ---
 
@@ -251,22 +227,25 @@ def _process_create_table(o2p: O2P, table_name: str, columns: List):
         line = f", {pgs_column_name}".ljust(35)
 
         if tab_col in column_datatypes:
-            line += column_datatypes[tab_col]
+            pgs_data_type = column_datatypes[tab_col]
         elif data_type in ['BINARY_DOUBLE', 'BINARY_FLOAT', 'FLOAT', 'NUMBER']:
-            line += _get_number_datatype(pgs_column_name, record, cols)
+            pgs_data_type = _get_number_datatype(pgs_column_name, record, cols)
         elif 'CHAR' in data_type:
-            line += f"VARCHAR({record[cols['data_length']]})"
+            pgs_data_type = f"VARCHAR({record[cols['data_length']]})"
         elif data_type == 'DATE':
-            line += "TIMESTAMP(0)"
+            pgs_data_type = "TIMESTAMP(0)"
         elif data_type.startswith('TIMESTAMP'):
-            line += record[cols['data_type']]
+            pgs_data_type = record[cols['data_type']]
         elif data_type in ['CLOB', 'NCLOB', 'LONG']:
-            line += "TEXT"
+            pgs_data_type = "TEXT"
         elif record[cols['data_type']] in ['BLOB', 'LONG RAW']:
-            line += "BYTEA"
+            pgs_data_type = "BYTEA"
         else:
             o2p.log(f"Unknown column: {tab_col}, {data_type}")
-            line += "UNKNOWN"
+            pgs_data_type = "UNKNOWN"
+
+        datatypes[tab_col] = pgs_data_type
+        line += pgs_data_type
 
         if record[cols['nullable']] == 'N':
             line += ' NOT NULL'
@@ -276,8 +255,11 @@ def _process_create_table(o2p: O2P, table_name: str, columns: List):
 
     # ---
 
+    # Unlogged until the data is loaded, when bulk loading
+    unlogged = 'UNLOGGED ' if o2p.get_parameter(BULK_LOAD) and o2p.get_parameter(ETL_DATA) else ''
+
     o2p.postgresql_cmd((
-        f"CREATE TABLE %%schema%%.{o2p.rename_object(TABLE, table_name)} \n("
+        f"CREATE {unlogged}TABLE %%schema%%.{o2p.rename_object(TABLE, table_name)} \n("
         + ('\n'.join(lines)).lstrip(',')
         + f"\n) {o2p.get_parameter('_tables')[table_name]}\n;\n"
     ))
@@ -286,11 +268,20 @@ def _process_create_table(o2p: O2P, table_name: str, columns: List):
 # -----------------------------------------------
 
 
+def keys(o2p: O2P, table_name: str):
+    """ Builds the primary and unique key constraint statements, deferred until after the data """
+
+    _process_create_puks(o2p, table_name)
+
+
+# ---
+
+
 def main(o2p: O2P, table_name: str, columns: List):
     """ Creates a set of sql files for creating tables in postgresql """
 
     _process_create_table(o2p, table_name, columns)
-    if o2p.get_parameter(ETL_CONSTRAINTS):
+    if o2p.get_parameter(ETL_CONSTRAINTS) and not o2p.get_parameter(DEFER_KEYS):
         _process_create_puks(o2p, table_name)
     if o2p.get_parameter(ETL_COMMENTS):
         _process_create_comments_tab(o2p, table_name)
@@ -33,14 +33,8 @@ def _get_pgsised_code(o2p: O2P, text: str) -> str:
 def _process_trg_function(o2p: O2P, trigger_name: str):
     """ Builds a trigger function from the Oracle code """
 
-    query = (
-        "SELECT us.text"
-        "  FROM user_source us "
-        f"WHERE us.name = '{trigger_name}'"
-        " ORDER BY us.line"
-    )
-
-    ora_text = [i[0] for i in o2p.oracle_query(query)]
+    records, cols = o2p.catalog_iter('trigger_source', trigger_name)
+    ora_text = (i[cols['text']] for i in records)
     pgs_text = ''
     body = False
 